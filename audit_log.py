@@ -0,0 +1,177 @@
+# -------------------------------------------------------------
+# audit_log.py
+# Write-behind buffer for the log_collection mirror: batched off the request path.
+import asyncio
+import logging
+import time
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from metrics import AUDIT_FLUSH_SECONDS, AUDIT_WRITES_FAILED
+
+
+class AuditLogBuffer:
+    """
+    Collects log mirror writes in memory and flushes them with unordered
+    bulk_write when `max_batch` ops are waiting or every `flush_interval`
+    seconds. $set updates with the same filter and upsert flag are coalesced
+    into one op, later fields winning. Each flush writes the inserts first and
+    then the updates, so an update always lands after the insert it follows.
+
+    A failed flush is put back and retried on the next round. Past
+    `max_pending` ops the oldest are dropped, so a Mongo outage cannot grow
+    memory without bound. Ops still buffered when the process dies are lost,
+    which is acceptable for an audit trail nobody reads in real time.
+    """
+
+    def __init__(self, collection, max_batch: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 50000):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._inserts = []
+        self._updates = {}  # (filter items, upsert) -> [filter, $set fields, upsert]
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+        self.queued = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush_seconds = None
+        self.last_error = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._inserts) + len(self._updates)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background loop and flush whatever is still buffered."""
+        if self._task is not None:
+            # Let the loop finish its current flush rather than cancelling it half-way
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._stopping = False
+        await self.flush()
+        if self.depth:
+            logging.error(f"Audit buffer stopped with {self.depth} unwritten op(s)")
+
+    def insert(self, doc: dict):
+        self._inserts.append(doc)
+        self._queued(1)
+
+    def update(self, filter: dict, fields: dict, upsert: bool = False):
+        """Buffer update_one(filter, {"$set": fields}, upsert=upsert)."""
+        self._merge(filter, fields, upsert)
+        self._queued(1)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_batch": self.max_batch,
+            "flush_interval": self.flush_interval,
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_error": self.last_error,
+        }
+
+    async def flush(self):
+        """Write everything buffered so far (one bulk_write for inserts, one for updates)."""
+        async with self._flush_lock:
+            if not self.depth:
+                return
+            inserts, updates = self._inserts, self._updates
+            self._inserts, self._updates = [], {}
+
+            start = time.perf_counter()
+            try:
+                await self._write([InsertOne(doc) for doc in inserts])
+                inserts = []
+                await self._write([UpdateOne(f, {"$set": s}, upsert=u) for f, s, u in updates.values()])
+            except Exception as e:
+                # Connection-level failure: nothing reliable about what landed, so retry it all
+                self.last_error = str(e)
+                logging.warning(f"Audit flush failed, retrying {len(inserts) + len(updates)} op(s): {e}")
+                self._requeue(inserts, updates)
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                self.last_flush_seconds = round(elapsed, 4)
+                AUDIT_FLUSH_SECONDS.observe(elapsed)
+            self.flushes += 1
+
+    async def _write(self, ops: list):
+        if not ops:
+            return
+        try:
+            await self.collection.bulk_write(ops, ordered=False)
+            self.written += len(ops)
+        except BulkWriteError as e:
+            # Per-document errors (e.g. duplicate key) won't succeed on retry; count and move on
+            errors = len(e.details.get("writeErrors", []))
+            self.written += len(ops) - errors
+            self.failed += errors
+            AUDIT_WRITES_FAILED.inc(amount=errors)
+            self.last_error = str(e.details.get("writeErrors", [{}])[0].get("errmsg"))
+            logging.error(f"Audit bulk write: {errors} of {len(ops)} op(s) failed: {self.last_error}")
+
+    def _merge(self, filter: dict, fields: dict, upsert: bool, requeued: bool = False):
+        key = (tuple(sorted(filter.items())), upsert)
+        pending = self._updates.get(key)
+        if pending is None:
+            self._updates[key] = [filter, dict(fields), upsert]
+        else:
+            pending[1].update(fields)
+            if not requeued:
+                self.coalesced += 1
+
+    def _requeue(self, inserts: list, updates: dict):
+        # Older ops go back in front of anything buffered during the failed flush
+        newer_updates = self._updates
+        self._inserts = inserts + self._inserts
+        self._updates = {}
+        for filter, fields, upsert in list(updates.values()) + list(newer_updates.values()):
+            self._merge(filter, fields, upsert, requeued=True)
+        self._trim()
+
+    def _queued(self, count: int):
+        self.queued += count
+        self._trim()
+        if self.depth >= self.max_batch:
+            self._wakeup.set()
+
+    def _trim(self):
+        while self.depth > self.max_pending:
+            if self._inserts:
+                self._inserts.pop(0)
+            else:
+                self._updates.pop(next(iter(self._updates)))
+            self.dropped += 1
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Audit flush loop error: {e}")
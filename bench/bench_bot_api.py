@@ -0,0 +1,77 @@
+# -------------------------------------------------------------
+# bench/bench_bot_api.py
+# Compare the old per-call `requests` path with the pooled BotAPI client.
+#
+#   uvicorn bench.stub_bot_api:app --port 8081 &
+#   python -m bench.bench_bot_api --url http://127.0.0.1:8081 --calls 500 --concurrency 20
+import argparse
+import asyncio
+import statistics
+import time
+
+import requests
+
+from bot_api import BotAPI
+
+
+def _report(name: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<22} calls={len(latencies):<6} "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+          f"p95={p95 * 1000:7.2f}ms "
+          f"throughput={len(latencies) / elapsed:8.1f}/s")
+
+
+async def bench_requests(url: str, token: str, calls: int, concurrency: int):
+    """Baseline: a fresh connection per call, run in worker threads (old `_tg_get`)."""
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await asyncio.to_thread(requests.get, f"{url}/bot{token}/sendMessage?chat_id=1&text=hi")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    _report("requests (per call)", latencies, time.perf_counter() - start)
+
+
+async def bench_pooled(url: str, token: str, calls: int, concurrency: int):
+    """Shared keep-alive pool, the path main.py now uses."""
+    api = BotAPI(token, base_url=url)
+    await api.start()
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await api.call("sendMessage", {"chat_id": 1, "text": "hi"})
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await api.call("getMe")  # warm the pool, as lifespan does in production
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(calls)))
+        _report("BotAPI (pooled)", latencies, time.perf_counter() - start)
+    finally:
+        await api.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8081")
+    parser.add_argument("--token", default="123:stub")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    await bench_requests(args.url, args.token, args.calls, args.concurrency)
+    await bench_pooled(args.url, args.token, args.calls, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
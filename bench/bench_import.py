@@ -0,0 +1,122 @@
+# -------------------------------------------------------------
+# bench/bench_import.py
+# Throughput and peak memory of the streaming import pipeline.
+#
+#   python -m bench.bench_import --rows 500000
+#   python -m bench.bench_import --rows 50000 --legacy      # the old read-all + iterrows path instead
+#   python -m bench.bench_import --mongo-uri mongodb://localhost:27017   # include real inserts
+#
+# Telegram lookups are replaced by a resolver that answers instantly, so the
+# numbers cover parsing, cleaning, dedupe and writes only.
+import argparse
+import asyncio
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("DB", "bench")
+os.environ.setdefault("USER_COLLECTION", "bench_users")
+os.environ.setdefault("LOG_COLLECTION", "bench_log")
+
+import pandas as pd
+
+from importer import read_upload_chunks, import_chunks, IMPORT_CHUNK_SIZE
+from util import transform_row_data
+
+
+class InstantResolver:
+    async def resolve_many(self, phones):
+        return {phone: (None, None) for phone in phones}
+
+
+class NullCollection:
+    """Write sink used when no --mongo-uri is given."""
+
+    async def find_one(self, *args, **kwargs):
+        return None
+
+    def find(self, *args, **kwargs):
+        return _EmptyCursor()
+
+    async def insert_many(self, docs, ordered=True):
+        return None
+
+
+class _EmptyCursor:
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+def write_csv(path: str, rows: int):
+    fields = ["phone", "mobile", "account_name", "full_name", "email", "pan_number",
+              "start_date", "expiry_date", "telegram_name", "status", "calling_status"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for i in range(rows):
+            phone = str(random.randint(6000000000, 9999999999))
+            writer.writerow([
+                phone, "0" + phone, f"acct{i}", f"User {i}", f"user{i}@example.com",
+                f"ABCDE{i % 10000:04d}F", "19 Dec, 2024", "19 Dec, 2025", f"@user{i}",
+                random.choice(["active", "expired", ""]), random.choice(["called", "nan", ""]),
+            ])
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux; it only grows, so run each mode in its own process for clean peaks
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_streaming(path: str, coll, chunksize: int):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        summary = await import_chunks(read_upload_chunks(f, path, chunksize), coll, "phone", InstantResolver())
+    elapsed = time.perf_counter() - start
+    print(f"streaming: rows={summary['rows']} inserted={summary['total_inserted']} "
+          f"time={elapsed:.2f}s rate={summary['rows'] / elapsed:,.0f} rows/s peak_rss={peak_rss_mb():.0f}MB")
+
+
+def run_legacy(path: str):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        df = pd.read_csv(f)
+    rows = [transform_row_data(row) for _, row in df.iterrows()]
+    elapsed = time.perf_counter() - start
+    print(f"legacy:    rows={len(rows)} (transform only) "
+          f"time={elapsed:.2f}s rate={len(rows) / elapsed:,.0f} rows/s peak_rss={peak_rss_mb():.0f}MB")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--chunksize", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--mongo-uri")
+    args = parser.parse_args()
+
+    coll = NullCollection()
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        coll = AsyncIOMotorClient(args.mongo_uri)["bench"]["bench_import"]
+        await coll.drop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "users.csv")
+        write_csv(path, args.rows)
+        print(f"generated {args.rows} rows ({os.path.getsize(path) / 1e6:.1f}MB)")
+        print(f"baseline rss={peak_rss_mb():.0f}MB")
+        if args.legacy:
+            run_legacy(path)
+        else:
+            await run_streaming(path, coll, args.chunksize)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
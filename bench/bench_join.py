@@ -0,0 +1,107 @@
+# -------------------------------------------------------------
+# bench/bench_join.py
+# Per-join Mongo time: the old five sequential round trips vs atomic claim + one concurrent follow-up.
+#
+#   python -m bench.bench_join --mongo-uri mongodb://localhost:27017 --joins 2000 --concurrency 20
+#
+# Bot API calls and the Telegram lookup are left out; only the Mongo work of
+# process_join_request is timed. Uses (and drops) a throwaway database.
+import argparse
+import asyncio
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, ReturnDocument
+
+
+def _report(name: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<28} joins={len(latencies):<6} "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+          f"p95={p95 * 1000:7.2f}ms "
+          f"throughput={len(latencies) / elapsed:8.1f}/s")
+
+
+def _update(user_id: int) -> dict:
+    return {"joined": True, "telegram_id": user_id, "username": f"u{user_id}",
+            "left_group": False, "left_at": None, "link_used": True}
+
+
+async def legacy_join(users, log, link: str, user_id: int):
+    """The pre-claim pipeline: find, update, re-read, update, log upsert."""
+    sub = await users.find_one({"group_link": link, "joined": False, "link_used": False})
+    if not sub:
+        return
+    update_data = _update(user_id)
+    await users.update_one({"group_link": link}, {"$set": update_data})
+    same = await users.find_one({"group_link": link})
+    update_data.update({"same_user_join": True, "privacy_nobody": False})
+    await users.update_one({"group_link": link}, {"$set": {"same_user_join": True, "privacy_nobody": False}})
+    await log.update_one({"group_link": link}, {"$set": {"group_link": link, "phone": same["phone"], **update_data}},
+                         upsert=True)
+
+
+async def claim_join(users, log, link: str, user_id: int):
+    """Atomic claim returning the document, then the follow-up writes concurrently."""
+    update_data = _update(user_id)
+    sub = await users.find_one_and_update(
+        {"group_link": link, "joined": False, "link_used": False},
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not sub:
+        return
+    update_data.update({"same_user_join": True, "privacy_nobody": False})
+    await asyncio.gather(
+        users.update_one({"_id": sub["_id"]}, {"$set": {"same_user_join": True, "privacy_nobody": False}}),
+        log.update_one({"group_link": link}, {"$set": {"group_link": link, **update_data}}, upsert=True),
+    )
+
+
+async def run(db, name: str, join, joins: int, concurrency: int):
+    prefix = name.split()[0]
+    users, log = db[f"{prefix}_users"], db[f"{prefix}_log"]
+    await users.create_index([("group_link", ASCENDING), ("joined", ASCENDING), ("link_used", ASCENDING)])
+    await log.create_index([("group_link", ASCENDING)])
+    await users.insert_many([
+        {"phone": f"+91{9000000000 + i}", "group_link": f"https://t.me/+bench{i}", "joined": False, "link_used": False}
+        for i in range(joins)
+    ])
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with sem:
+            start = time.perf_counter()
+            await join(users, log, f"https://t.me/+bench{i}", 100000 + i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(joins)))
+    _report(name, latencies, time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="bench_join")
+    parser.add_argument("--joins", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongo_uri)
+    await client.drop_database(args.db)
+    db = client[args.db]
+    try:
+        await run(db, "legacy (5 sequential)", legacy_join, args.joins, args.concurrency)
+        await run(db, "claim + concurrent follow-up", claim_join, args.joins, args.concurrency)
+    finally:
+        await client.drop_database(args.db)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
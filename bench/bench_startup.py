@@ -0,0 +1,88 @@
+# -------------------------------------------------------------
+# bench/bench_startup.py
+# Cold start: time to import `main`, and time from process start to the first response.
+#
+#   python -m bench.bench_startup --runs 5
+#
+# Every run is a fresh interpreter. The first request goes through the ASGI app
+# in-process (httpx ASGITransport) without lifespan, since lifespan needs a
+# logged-in Telethon session; it covers import, app construction and routing.
+# Heavy modules that should only load on first use are reported if they show up.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_ENV = {
+    "API_ID": "1",
+    "API_HASH": "bench",
+    "PORT": "8000",
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DB": "bench",
+    "USER_COLLECTION": "bench_users",
+    "LOG_COLLECTION": "bench_log",
+}
+
+# Deferred to lifespan or the import endpoints; none of these should load on import
+LAZY_MODULES = ["pandas", "openpyxl"]
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+import sys, json, asyncio
+import main
+t_import = time.perf_counter() - t0
+
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        r = await c.get("/dispatcher-stats")
+        return r.status_code
+
+status = asyncio.run(first_request())
+t_first = time.perf_counter() - t0
+print(json.dumps({
+    "import": t_import,
+    "first_request": t_first,
+    "status": status,
+    "loaded": [m for m in %r if m in sys.modules],
+    "scheduler_running": main.scheduler.running,
+    "mongo_connected": main.mongo.client is not None,
+}))
+""" % (LAZY_MODULES,)
+
+
+def run_once() -> dict:
+    env = {**DEFAULT_ENV, **os.environ}
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    imports = [r["import"] for r in results]
+    firsts = [r["first_request"] for r in results]
+    last = results[-1]
+
+    print(f"import main          p50={statistics.median(imports) * 1000:7.1f}ms "
+          f"min={min(imports) * 1000:7.1f}ms  runs={args.runs}")
+    print(f"time to 1st request  p50={statistics.median(firsts) * 1000:7.1f}ms "
+          f"min={min(firsts) * 1000:7.1f}ms  status={last['status']}")
+    print(f"loaded on import     {last['loaded'] or 'none'}")
+    print(f"scheduler running    {last['scheduler_running']}")
+    print(f"mongo connected      {last['mongo_connected']}")
+
+
+if __name__ == "__main__":
+    main()
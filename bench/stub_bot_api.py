@@ -0,0 +1,67 @@
+# -------------------------------------------------------------
+# bench/stub_bot_api.py
+# Local stand-in for api.telegram.org so Bot API latency can be measured offline.
+#
+#   uvicorn bench.stub_bot_api:app --port 8081
+#   TELEGRAM_API_URL=http://127.0.0.1:8081 uvicorn main:app ...
+#
+# STUB_LATENCY_MS adds a fixed server-side delay to every call.
+import asyncio
+import itertools
+import os
+import secrets
+import time
+
+from fastapi import FastAPI, Request
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+
+app = FastAPI()
+_message_ids = itertools.count(1)
+_update_ids = itertools.count(1)
+
+
+def _invite_link(params: dict) -> dict:
+    return {
+        "invite_link": f"https://t.me/+{secrets.token_urlsafe(12)}",
+        "creator": {"id": 1, "is_bot": True, "first_name": "Stub"},
+        "expire_date": params.get("expire_date") or int(time.time()) + 86400,
+        "creates_join_request": bool(params.get("creates_join_request")),
+        "is_primary": False,
+        "is_revoked": False,
+    }
+
+
+def _result(method: str, params: dict):
+    if method == "createChatInviteLink":
+        return _invite_link(params)
+    if method == "revokeChatInviteLink":
+        return {**_invite_link(params), "invite_link": params.get("invite_link"), "is_revoked": True}
+    if method == "sendMessage":
+        return {
+            "message_id": next(_message_ids),
+            "chat": {"id": params.get("chat_id"), "type": "private"},
+            "date": int(time.time()),
+            "text": params.get("text", ""),
+        }
+    if method == "getUpdates":
+        return []
+    return True
+
+
+@app.post("/bot{token}/{method}")
+async def bot_method(token: str, method: str, request: Request):
+    try:
+        params = await request.json()
+    except Exception:
+        params = dict(request.query_params)
+    if STUB_LATENCY_MS:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    return {"ok": True, "result": _result(method, params or {})}
+
+
+@app.get("/bot{token}/{method}")
+async def bot_method_get(token: str, method: str, request: Request):
+    if STUB_LATENCY_MS:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    return {"ok": True, "result": _result(method, dict(request.query_params))}
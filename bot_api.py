@@ -0,0 +1,73 @@
+# -------------------------------------------------------------
+# bot_api.py
+# Shared async client for the Telegram Bot API.
+import importlib.util
+import logging
+import time
+
+import httpx
+
+from metrics import BOT_API_SECONDS, BOT_API_ERRORS
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+# HTTP/2 needs the optional `h2` package; fall back to pooled HTTP/1.1 without it.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class BotAPI:
+    """One pooled keep-alive connection set for every Bot API method call."""
+
+    def __init__(self, token: str, base_url: str = TELEGRAM_API_URL, timeout: float = 10.0,
+                 max_connections: int = 50, max_keepalive: int = 20):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self._client = None
+
+    async def start(self):
+        """Open the connection pool (called from lifespan)."""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=f"{self.base_url}/bot{self.token}/",
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=60,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+        )
+        logging.info(f"Bot API client started (http2={HTTP2_AVAILABLE})")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def call(self, method: str, params: dict = None, timeout: float = None) -> dict:
+        """
+        POST a Bot API method with a JSON body and return the decoded response.
+        `timeout` overrides the client default for this call only.
+        """
+        if self._client is None:
+            await self.start()
+        start = time.perf_counter()
+        try:
+            response = await self._client.post(
+                method,
+                json=params or {},
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+            result = response.json()
+        except Exception as e:
+            BOT_API_ERRORS.inc(method, type(e).__name__)
+            raise
+        finally:
+            BOT_API_SECONDS.observe(time.perf_counter() - start, method)
+        if not result.get("ok", True):
+            BOT_API_ERRORS.inc(method, str(result.get("error_code", response.status_code)))
+        return result
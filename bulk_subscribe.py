@@ -0,0 +1,165 @@
+# -------------------------------------------------------------
+# bulk_subscribe.py
+# /subscribe and /extend-plan for a whole list: one lookup, concurrent links, one bulk write.
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+JOIN_MESSAGE = "Click below to join. Your request will be approved automatically."
+
+
+def new_subscription(phone: str, group_link: str, expiry: datetime) -> dict:
+    return {
+        "_id": ObjectId(),  # set here so results and timers don't depend on the driver filling it in
+        "phone": phone,
+        "group_link": group_link,
+        "expiry_date": expiry,
+        "joined": False,
+        "telegram_id": None,
+        "username": None,
+        "left_group": False,
+        "left_at": None,
+        "link_used": False,
+    }
+
+
+class BulkSubscriber:
+    """
+    Runs the single-item /subscribe and /extend-plan rules over many phones.
+    Existing users come from one $in query. Invite links for new users are
+    fetched concurrently, at most `link_concurrency` at a time, so a cold
+    invite pool doesn't flood createChatInviteLink. All writes go out as one
+    unordered bulk_write; the log mirror goes through the audit buffer.
+    Every item gets its own result, in request order.
+    """
+
+    def __init__(self, users_collection, audit_log, invite_pool, expiry_timer, stats,
+                 notify, validate_phone, link_concurrency: int = 8):
+        self.users = users_collection
+        self.audit_log = audit_log
+        self.invite_pool = invite_pool
+        self.expiry_timer = expiry_timer
+        self.stats = stats
+        self.notify = notify  # async (text, telegram_id)
+        self.validate_phone = validate_phone
+        self.link_concurrency = link_concurrency
+        self._notify_tasks = set()
+
+    async def subscribe(self, items: list) -> list:
+        return await self._run(items, extend=False)
+
+    async def extend(self, items: list) -> list:
+        return await self._run(items, extend=True)
+
+    async def _run(self, items: list, extend: bool) -> list:
+        results = [None] * len(items)
+        pending = {}  # phone -> index of its first valid occurrence
+        for i, item in enumerate(items):
+            if not self.validate_phone(item.phone) or item.duration_days <= 0:
+                results[i] = {"phone": item.phone, "status_code": 0, "message": "Invalid input"}
+            elif item.phone in pending:
+                results[i] = {"phone": item.phone, "status_code": 0, "message": "Duplicate phone in request"}
+            else:
+                pending[item.phone] = i
+
+        existing = {}
+        if pending:
+            cursor = self.users.find({"phone": {"$in": list(pending)}},
+                                     {"phone": 1, "joined": 1, "expiry_date": 1, "telegram_id": 1})
+            async for user in cursor:
+                existing[user["phone"]] = user
+
+        now = datetime.now()
+        creates, extends = [], []  # (index, phone, days[, user])
+        for phone, i in pending.items():
+            days = items[i].duration_days
+            user = existing.get(phone)
+            if user is None:
+                creates.append((i, phone, days))
+            elif extend:
+                extends.append((i, phone, days, user))
+            elif user.get("joined"):
+                results[i] = {"phone": phone, "status_code": 0, "message": "Already Joined group"}
+            elif user["expiry_date"] > now:
+                results[i] = {"phone": phone, "status_code": 1,
+                              "message": "Already generated link Please contact by admin."}
+            else:
+                results[i] = {"phone": phone, "status_code": 0, "message": "Subscription expired"}
+
+        links = await self._get_links(len(creates))
+
+        user_ops, written = [], []  # written[op index] = (item index, result, doc, created)
+        for (i, phone, days), link in zip(creates, links):
+            if not link:
+                logging.error(f"No invite link available for {phone}")
+                results[i] = {"phone": phone, "status_code": 0, "message": "Failed to create link"}
+                continue
+            doc = new_subscription(phone, link, now + timedelta(days=days))
+            user_ops.append(InsertOne(doc))
+            data = {k: v for k, v in doc.items() if k != "_id"}
+            written.append((i, {"phone": phone, "status_code": 1, "message": JOIN_MESSAGE, "data": data}, doc, True))
+
+        for i, phone, days, user in extends:
+            new_expiry = max(user["expiry_date"], now) + timedelta(days=days)
+            user_ops.append(UpdateOne({"_id": user["_id"]}, {"$set": {"expiry_date": new_expiry}}))
+            written.append((i, {"phone": phone, "status_code": 1, "expiry_date": new_expiry, "group_link": None},
+                            {**user, "expiry_date": new_expiry}, False))
+
+        failed = await self._bulk_write(self.users, user_ops)
+        succeeded = []
+        for op_index, (i, result, doc, created) in enumerate(written):
+            if op_index in failed:
+                results[i] = {"phone": result["phone"], "status_code": 0, "message": failed[op_index]}
+            else:
+                results[i] = result
+                succeeded.append((doc, created))
+
+        # The log mirror only gets the writes that landed in users
+        added = []
+        for doc, created in succeeded:
+            self.expiry_timer.schedule(doc["_id"], doc["expiry_date"])
+            if created:
+                self.audit_log.insert(doc.copy())
+                added.append(doc)
+                continue
+            self.audit_log.update({"phone": doc["phone"]}, {"expiry_date": doc["expiry_date"]})
+            if doc.get("telegram_id"):
+                self._notify(f"Plan extended to {doc['expiry_date']:%Y-%m-%d}", doc["telegram_id"])
+        if added:
+            await self.stats.added_many(added)
+        return results
+
+    async def _get_links(self, count: int) -> list:
+        limit = asyncio.Semaphore(self.link_concurrency)
+
+        async def one():
+            async with limit:
+                try:
+                    return await self.invite_pool.get()
+                except Exception as e:
+                    logging.error(f"Invite link creation failed: {e}")
+                    return None
+
+        return await asyncio.gather(*(one() for _ in range(count)))
+
+    async def _bulk_write(self, collection, ops: list) -> dict:
+        """Unordered bulk_write; returns {op index: error message} for the ops that failed."""
+        if not ops:
+            return {}
+        try:
+            await collection.bulk_write(ops, ordered=False)
+            return {}
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            logging.error(f"Bulk write to {collection.name}: {len(errors)} of {len(ops)} failed")
+            return {err["index"]: err.get("errmsg", "Write failed") for err in errors}
+
+    def _notify(self, text: str, telegram_id):
+        # Sends are paced by the dispatcher; don't hold the HTTP response for them
+        task = asyncio.create_task(self.notify(text, telegram_id))
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_tasks.discard)
@@ -0,0 +1,74 @@
+# -------------------------------------------------------------
+# check_query_plans.py
+# Explain every hot query and fail if any of them falls back to a COLLSCAN
+# (tests/test_query_plans.py runs the same check under pytest).
+#
+#   python check_query_plans.py            # uses MONGO_URI / DB / *_COLLECTION from .env
+#   python check_query_plans.py --ensure   # create the indexes first
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from indexes import ensure_indexes, hot_queries
+
+
+def plan_stages(plan: dict):
+    """Yield every stage name in a (possibly nested) winning plan."""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for child_key in ("inputStage", "queryPlan"):
+        yield from plan_stages(plan.get(child_key))
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+def collections_from_env(db) -> dict:
+    """The collections hot_queries() names, resolved from the same env vars main.py uses."""
+    return {
+        "users": db[os.getenv("USER_COLLECTION")],
+        "log": db[os.getenv("LOG_COLLECTION")],
+        "import_users": db[os.getenv("IMPORT_USERS_COLLECTION")],
+        "temp_users": db[os.getenv("TEMP_USERS_COLLECTION")],
+        "import_jobs": db[os.getenv("IMPORT_JOBS_COLLECTION", "import_jobs")],
+    }
+
+
+async def query_stages(coll, query: dict) -> list:
+    explain = await coll.find(query).explain()
+    return list(plan_stages(explain["queryPlanner"]["winningPlan"]))
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ensure", action="store_true", help="run ensure_indexes() before explaining")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = AsyncIOMotorClient(os.getenv("MONGO_URI"))[os.getenv("DB")]
+    collections = collections_from_env(db)
+    if args.ensure:
+        # "existing": a differently named index on the same key was kept (code 85/86);
+        # the explains below show whether it still serves the query
+        for name, index, outcome in await ensure_indexes(collections):
+            print(f"{outcome:<10} {name}.{index}")
+        print()
+
+    failures = 0
+    for name, query in hot_queries():
+        stages = await query_stages(collections[name], query)
+        ok = "COLLSCAN" not in stages
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<13} {' > '.join(stages):<28} {query}")
+
+    print(f"\n{failures} of {len(hot_queries())} queries use a COLLSCAN")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,144 @@
+# -------------------------------------------------------------
+# database.py
+# One MongoDB connection pool shared by main, util and the background jobs.
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from metrics import MongoCommandMetrics
+
+load_dotenv()
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection checkout counts and wait times, fed by pymongo's pool events."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checked_out = 0
+        self.connections = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+    # ---- pymongo callbacks ----
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+        self.checked_out += 1
+        wait = getattr(event, "duration", 0.0) or 0.0
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_created(self, event):
+        self.connections += 1
+
+    def connection_closed(self, event):
+        self.connections -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+class _LazyCollection:
+    """Stands in for a Motor collection until MongoManager.connect() has run."""
+
+    def __init__(self, manager, name: str):
+        self._manager = manager
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._manager.db[self._name], attr)
+
+    def __repr__(self):
+        return f"<collection {self._name}>"
+
+
+class MongoManager:
+    """Creates the Motor client on connect() (from lifespan) and hands out collections."""
+
+    def __init__(self, uri: str, db_name: str, max_pool_size: int = 100, min_pool_size: int = 0,
+                 wait_queue_timeout_ms: int = 10000):
+        self.uri = uri
+        self.db_name = db_name
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.wait_queue_timeout_ms = wait_queue_timeout_ms
+        self.pool_stats = PoolStats()
+        self.listeners = [self.pool_stats, MongoCommandMetrics()]
+        self.client = None
+
+    def connect(self):
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                self.uri,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                waitQueueTimeoutMS=self.wait_queue_timeout_ms,
+                event_listeners=self.listeners,
+            )
+            logging.info(f"MongoDB client created (maxPoolSize={self.max_pool_size})")
+        return self.client
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    @property
+    def db(self):
+        if self.client is None:
+            raise RuntimeError("MongoDB not connected; call mongo.connect() in lifespan first")
+        return self.client[self.db_name]
+
+    def collection(self, name: str):
+        return _LazyCollection(self, name)
+
+    def stats(self) -> dict:
+        return {
+            "max_pool_size": self.max_pool_size,
+            "min_pool_size": self.min_pool_size,
+            **self.pool_stats.stats(),
+        }
+
+
+mongo = MongoManager(
+    os.getenv("MONGO_URI"),
+    os.getenv("DB"),
+    max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    min_pool_size=int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    wait_queue_timeout_ms=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+)
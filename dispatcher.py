@@ -0,0 +1,224 @@
+# -------------------------------------------------------------
+# dispatcher.py
+# Rate-limited outbound queue for Bot API sends.
+import asyncio
+import collections
+import logging
+import time
+
+# Telegram: ~30 messages/second overall, ~1 message/second to the same chat.
+GLOBAL_RATE = 30
+PER_CHAT_RATE = 1
+MAX_ATTEMPTS = 5
+RATE_WINDOW = 10  # seconds used for the send-rate figure
+
+
+class TokenBucket:
+    """Classic token bucket; take() returns 0 when a token was taken, else seconds to wait."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Job:
+    __slots__ = ("method", "params", "chat_key", "future", "attempts")
+
+    def __init__(self, method, params, chat_key, future):
+        self.method = method
+        self.params = params
+        self.chat_key = chat_key
+        self.future = future
+        self.attempts = 0
+
+
+class OutboundDispatcher:
+    """
+    Paces Bot API calls under a global and a per-chat token bucket.
+    A 429 pauses every sender until its `retry_after` has passed, so retries
+    are coalesced behind one deadline instead of each caller hammering the API.
+    """
+
+    def __init__(self, bot_api, global_rate: float = GLOBAL_RATE, per_chat_rate: float = PER_CHAT_RATE,
+                 per_chat_burst: float = 1, senders: int = 8):
+        self.bot_api = bot_api
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.senders = senders
+        self._chat_buckets = {}
+        self._queue = None
+        self._workers = []
+        self._delayed = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._sent_times = collections.deque()
+        self.sent_total = 0
+        self.failed_total = 0
+        self.throttled_total = 0
+
+    # ---- lifecycle ----
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._sender()) for _ in range(self.senders)]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Give queued sends a moment to go out, then cancel the senders."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Dispatcher stopped with {self.queue_depth} sends pending")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ---- public API ----
+    def submit(self, method: str, params: dict = None, chat_key=None) -> asyncio.Future:
+        """
+        Queue a Bot API call and return a future for its JSON response.
+        `chat_key` (usually the target chat id) enables the per-chat limit.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Job(method, params or {}, chat_key, future))
+        return future
+
+    def send_nowait(self, method: str, params: dict = None, chat_key=None) -> asyncio.Future:
+        """Fire-and-forget variant of submit(); failures are logged, not raised."""
+        future = self.submit(method, params, chat_key)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @property
+    def queue_depth(self) -> int:
+        return (self._queue.qsize() if self._queue else 0) + self._delayed
+
+    def send_rate(self) -> float:
+        """Successful sends per second over the last RATE_WINDOW seconds."""
+        self._trim_sent(time.monotonic())
+        return len(self._sent_times) / RATE_WINDOW
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self._in_flight,
+            "send_rate": round(self.send_rate(), 2),
+            "sent_total": self.sent_total,
+            "failed_total": self.failed_total,
+            "throttled_total": self.throttled_total,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "tracked_chats": len(self._chat_buckets),
+        }
+
+    # ---- internals ----
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logging.error(f"Dispatcher send failed: {future.exception()}")
+        elif not future.result().get("ok"):
+            logging.error(f"Dispatcher send rejected: {future.result()}")
+
+    def _trim_sent(self, now: float):
+        while self._sent_times and now - self._sent_times[0] > RATE_WINDOW:
+            self._sent_times.popleft()
+
+    def _chat_bucket(self, chat_key) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_key)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                self._prune_chat_buckets()
+            bucket = self._chat_buckets[chat_key] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket
+
+    def _prune_chat_buckets(self):
+        """Drop buckets that have refilled completely; they carry no state."""
+        now = time.monotonic()
+        idle = self.per_chat_burst / self.per_chat_rate
+        for key in [k for k, b in self._chat_buckets.items() if now - b.updated > idle]:
+            del self._chat_buckets[key]
+
+    def _requeue_later(self, job: _Job, delay: float):
+        """Park a job without holding a sender; it re-enters the queue after `delay`."""
+        self._delayed += 1
+
+        def _put():
+            self._delayed -= 1
+            self._queue.put_nowait(job)
+
+        asyncio.get_running_loop().call_later(delay, _put)
+
+    async def _sender(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._send(job)
+            except Exception as e:
+                self.failed_total += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, job: _Job):
+        if job.future.done():  # caller went away
+            return
+
+        # Per-chat limit: park the job instead of blocking a sender on one chat.
+        if job.chat_key is not None:
+            wait = self._chat_bucket(job.chat_key).take(time.monotonic())
+            if wait:
+                self._requeue_later(job, wait)
+                return
+
+        # Global limit and any 429 pause apply to every sender.
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            wait = self.global_bucket.take(now)
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+
+        job.attempts += 1
+        self._in_flight += 1
+        try:
+            result = await self.bot_api.call(job.method, job.params)
+        finally:
+            self._in_flight -= 1
+
+        if result.get("error_code") == 429 and job.attempts < MAX_ATTEMPTS:
+            retry_after = result.get("parameters", {}).get("retry_after", 1)
+            self.throttled_total += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            logging.warning(f"429 on {job.method}: pausing sends for {retry_after}s")
+            self._queue.put_nowait(job)
+            return
+
+        now = time.monotonic()
+        self._sent_times.append(now)
+        self._trim_sent(now)
+        if result.get("ok"):
+            self.sent_total += 1
+        else:
+            self.failed_total += 1
+        if not job.future.done():
+            job.future.set_result(result)
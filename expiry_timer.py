@@ -0,0 +1,115 @@
+# -------------------------------------------------------------
+# expiry_timer.py
+# Per-user expiry timers: kick within seconds of expiry_date instead of once a day.
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta
+
+
+class ExpiryTimer:
+    """
+    Min-heap of (deadline, _id) for subscriptions expiring within `horizon` seconds,
+    loaded from the expiry_date index and refreshed every `reload_interval`.
+    schedule() is called when /subscribe or /extend-plan sets a date; superseded
+    heap entries are skipped lazily via the `_deadlines` map.
+    """
+
+    def __init__(self, users_collection, expire, horizon: int = 3600, reload_interval: int = 600,
+                 concurrency: int = 10):
+        self.users = users_collection
+        self.expire = expire  # async (doc_id) -> bool, re-checks expiry before acting
+        self.horizon = horizon
+        self.reload_interval = reload_interval
+        self.concurrency = concurrency
+        self._heap = []
+        self._deadlines = {}  # _id -> deadline currently in force
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._next_reload = 0.0
+        self.fired = 0
+        self.expired = 0
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def schedule(self, doc_id, expiry_date: datetime):
+        """Track a new or changed expiry; dates beyond the horizon are picked up by a later reload."""
+        deadline = expiry_date.timestamp()
+        if deadline > time.time() + self.horizon:
+            self._deadlines.pop(doc_id, None)
+            return
+        if self._deadlines.get(doc_id) == deadline:
+            return
+        self._deadlines[doc_id] = deadline
+        heapq.heappush(self._heap, (deadline, str(doc_id), doc_id))
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        next_in = self._heap[0][0] - time.time() if self._heap else None
+        return {
+            "tracked": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "next_expiry_in": round(next_in, 1) if next_in is not None else None,
+            "fired": self.fired,
+            "expired": self.expired,
+            "max_lag_seconds": round(self.max_lag, 3),
+        }
+
+    async def _load(self):
+        # expiry_date is stored naive local time (datetime.now()), same as the endpoints write it
+        until = datetime.now() + timedelta(seconds=self.horizon)
+        cursor = self.users.find({"expiry_date": {"$lt": until}}, {"expiry_date": 1}).sort("expiry_date", 1)
+        async for doc in cursor:
+            self.schedule(doc["_id"], doc["expiry_date"])
+        self._next_reload = time.time() + self.reload_interval
+
+    async def _fire(self, doc_id, deadline: float, sem: asyncio.Semaphore):
+        try:
+            self.max_lag = max(self.max_lag, time.time() - deadline)
+            if await self.expire(doc_id):
+                self.expired += 1
+        except Exception as e:
+            logging.error(f"Expiry timer error for {doc_id}: {e}")
+        finally:
+            sem.release()
+
+    async def _run(self):
+        sem = asyncio.Semaphore(self.concurrency)
+        while True:
+            try:
+                if time.time() >= self._next_reload:
+                    await self._load()
+
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, _, doc_id = heapq.heappop(self._heap)
+                    if self._deadlines.get(doc_id) != deadline:
+                        continue  # superseded by an extension
+                    del self._deadlines[doc_id]
+                    self.fired += 1
+                    await sem.acquire()
+                    asyncio.create_task(self._fire(doc_id, deadline, sem))
+
+                wait = self._next_reload - time.time()
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - time.time())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(0.0, wait))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Expiry timer loop error: {e}")
+                await asyncio.sleep(5)
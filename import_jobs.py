@@ -0,0 +1,170 @@
+# -------------------------------------------------------------
+# import_jobs.py
+# Background import jobs with Mongo-persisted progress and resume.
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+from importer import read_upload_chunks, iter_in_thread, import_chunk
+
+JOB_CHUNK_SIZE = 1000  # rows per checkpoint
+MAX_STORED_ERRORS = 1000
+
+
+class ImportJobManager:
+    """
+    Runs uploads as asyncio tasks. The upload is copied to `upload_dir`, and
+    after every chunk the job document records rows_done, so a restarted process
+    skips finished chunks and carries on (resume_pending() in lifespan).
+    A chunk interrupted mid-way (or before its checkpoint was saved) is re-run.
+    Rows get _id "<job_id>:<row>", so the re-run recognises what it already
+    inserted and neither stores nor counts those rows twice.
+    With `run_remote` set (API workers in multi-worker mode), create() only records
+    the job and hands its id to the Telethon-owning process, which runs it via run().
+    """
+
+    def __init__(self, jobs_collection, resolver, targets: dict, upload_dir: str = "import_uploads",
+                 chunk_size: int = JOB_CHUNK_SIZE, run_remote=None):
+        self.jobs = jobs_collection
+        self.resolver = resolver
+        self.targets = targets  # name -> (collection, key)
+        self.upload_dir = upload_dir
+        self.chunk_size = chunk_size
+        self.run_remote = run_remote  # async (job_id) -> None
+        self._tasks = {}
+
+    async def create(self, upload, target: str) -> dict:
+        """Persist the upload to disk, record the job, and start it."""
+        filename = upload.filename.lower()
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, job_id + os.path.splitext(filename)[1])
+
+        def _copy():
+            upload.file.seek(0)
+            with open(path, "wb") as out:
+                shutil.copyfileobj(upload.file, out)
+
+        await asyncio.to_thread(_copy)
+
+        now = datetime.utcnow()
+        job = {
+            "_id": job_id,
+            "target": target,
+            "filename": filename,
+            "path": path,
+            "chunk_size": self.chunk_size,
+            "status": "queued",
+            "rows_done": 0,
+            "inserted": 0,
+            "resolved": 0,
+            "missing": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "errors": [],
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+        }
+        await self.jobs.insert_one(job)
+        if self.run_remote is not None:
+            try:
+                await self.run_remote(job_id)
+            except Exception as e:
+                # Stays queued; the runner picks it up in resume_pending() when it is back
+                logging.warning(f"Import job {job_id} queued, runner unavailable: {e}")
+        else:
+            self._start(job)
+        return job
+
+    async def get(self, job_id: str):
+        job = await self.jobs.find_one({"_id": job_id}, {"path": 0})
+        if job and job["status"] == "running":
+            job["flood_wait_seconds"] = (await self.resolver.status())["flood_wait_seconds"]
+        return job
+
+    async def run(self, job_id: str):
+        """Start a recorded job in this process (no-op if it is already running)."""
+        job = await self.jobs.find_one({"_id": job_id})
+        if job and job["_id"] not in self._tasks and job["status"] in ("queued", "running"):
+            self._start(job)
+
+    async def resume_pending(self):
+        """Restart jobs that were queued or running when the process last stopped."""
+        async for job in self.jobs.find({"status": {"$in": ["queued", "running"]}}):
+            if job["_id"] not in self._tasks:
+                logging.info(f"Resuming import job {job['_id']} at row {job['rows_done']}")
+                self._start(job)
+
+    async def stop(self):
+        """Cancel running jobs; their checkpoints let the next start resume them."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks = {}
+
+    def _start(self, job: dict):
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job["_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["_id"], None))
+
+    async def _update(self, job_id: str, update: dict):
+        update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+        await self.jobs.update_one({"_id": job_id}, update)
+
+    def _discard_upload(self, job: dict):
+        try:
+            os.remove(job["path"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Could not delete upload {job['path']}: {e}")
+
+    async def _run(self, job: dict):
+        job_id = job["_id"]
+        coll, key = self.targets[job["target"]]
+        chunk_size = job["chunk_size"]
+        skip_chunks = job["rows_done"] // chunk_size
+
+        try:
+            await self._update(job_id, {"$set": {"status": "running"}})
+            seen = set()
+            rows_done = job["rows_done"]
+            with open(job["path"], "rb") as f:
+                i = -1
+                async for df in iter_in_thread(read_upload_chunks(f, job["filename"], chunk_size)):
+                    i += 1
+                    if i < skip_chunks:
+                        continue
+                    result = await import_chunk(df, coll, key, self.resolver, seen, id_prefix=job_id)
+                    rows_done = i * chunk_size + len(df)
+                    await self._update(job_id, {
+                        "$set": {"rows_done": rows_done},
+                        "$inc": {
+                            "inserted": result["total_inserted"],
+                            "resolved": result["resolved"],
+                            "missing": result["missing"],
+                            "duplicates": result["duplicates"],
+                            "failed": len(result["errors"]) - result["missing"],
+                        },
+                        "$push": {"errors": {"$each": result["errors"], "$slice": MAX_STORED_ERRORS}},
+                    })
+
+            if not rows_done:
+                raise ValueError("Uploaded file is empty.")
+            await self._update(job_id, {"$set": {"status": "completed", "finished_at": datetime.utcnow()}})
+            self._discard_upload(job)
+            logging.info(f"Import job {job_id} completed")
+
+        except asyncio.CancelledError:
+            raise  # shutdown: leave status as running so it resumes
+        except Exception as e:
+            logging.error(f"Import job {job_id} failed: {e}", exc_info=True)
+            # Failed jobs are not resumed, so their copy of the customer data goes too
+            self._discard_upload(job)
+            await self._update(job_id, {"$set": {"status": "failed", "error": str(e),
+                                                 "finished_at": datetime.utcnow()}})
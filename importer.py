@@ -0,0 +1,152 @@
+# -------------------------------------------------------------
+# importer.py
+# Streaming CSV/XLSX import: chunked parsing, vectorized cleaning, batched inserts.
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError
+
+from util import transform_frame
+
+IMPORT_CHUNK_SIZE = 5000
+INSERT_BATCH_SIZE = 1000
+DUPLICATE_KEY = 11000
+
+
+def read_upload_chunks(fileobj, filename: str, chunksize: int = IMPORT_CHUNK_SIZE):
+    """
+    Yield DataFrames of at most `chunksize` rows.
+    CSV is parsed straight off the (spooled) upload file, so memory stays flat;
+    XLSX has no streaming reader and is sliced after loading.
+    pandas (and openpyxl, via read_excel) is imported here, on the first upload,
+    so it stays out of process startup. Parsing blocks: consume it through
+    iter_in_thread() from async code.
+    """
+    import pandas as pd
+
+    if filename.endswith(".csv"):
+        # dtype=str keeps phones as text, so no float round-trip ("98xxxx.0")
+        yield from pd.read_csv(fileobj, chunksize=chunksize, dtype=str, encoding_errors="ignore")
+    else:
+        df = pd.read_excel(fileobj)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+async def iter_in_thread(chunks):
+    """
+    Advance a blocking chunk generator (read_upload_chunks) in a worker thread:
+    read_excel and each read_csv chunk parse for seconds on large files, and on
+    the event loop that would stall /webhook, the join workers and Telethon.
+    """
+    it = iter(chunks)
+    while (df := await asyncio.to_thread(next, it, None)) is not None:
+        yield df
+
+
+async def insert_batches(coll, docs: list, key: str, batch_size: int = INSERT_BATCH_SIZE):
+    """
+    insert_many(ordered=False) in batches.
+    Returns (inserted key values, errors, duplicates); a failed document never stops
+    its batch, and duplicate-key rejections (a row raced in by another import) count
+    as skips rather than errors.
+    """
+    inserted, errors, duplicates = [], [], 0
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        failed = set()
+        try:
+            await coll.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed.add(err["index"])
+                if err.get("code") == DUPLICATE_KEY:
+                    duplicates += 1
+                else:
+                    errors.append({key: batch[err["index"]].get(key), "error": err.get("errmsg")})
+        inserted.extend(doc.get(key) for i, doc in enumerate(batch) if i not in failed and doc.get(key))
+    return inserted, errors, duplicates
+
+
+async def existing_keys(coll, key: str, values: list) -> dict:
+    """One $in query for a whole chunk instead of a find_one per row; returns {key value: stored doc}."""
+    if not values:
+        return {}
+    # "$gt": "" matches the partial unique index filter (indexes.py) so it can be used
+    cursor = coll.find({key: {"$in": values, "$gt": ""}}, {key: 1, "telegram_id": 1})
+    return {doc[key]: doc async for doc in cursor}
+
+
+async def import_chunk(df, coll, key: str, resolver, seen: set = None,
+                       insert_batch_size: int = INSERT_BATCH_SIZE, id_prefix: str = None) -> dict:
+    """
+    Run one chunk through transform → dedupe → batched Telegram lookup → insert_many.
+    `key` is the phone column the collection is keyed on ("phone" or "mobile");
+    `seen` carries keys already handled by earlier chunks of the same upload.
+    With `id_prefix` (a job id) every row gets _id "<id_prefix>:<row>", so re-running
+    an interrupted chunk recognises its own earlier inserts: rows without a key are
+    not stored twice, and keyed rows count as inserted rather than duplicates.
+    """
+    seen = set() if seen is None else seen
+    result = {"rows": len(df), "total_inserted": 0, "inserted": [], "missing": 0,
+              "duplicates": 0, "resolved": 0, "errors": []}
+    no_key, candidates = [], {}
+
+    # Collapse duplicates inside the file in memory first
+    for row_idx, mapped in zip(df.index, transform_frame(df)):
+        if id_prefix is not None:
+            mapped["_id"] = f"{id_prefix}:{row_idx}"
+        value = mapped.get(key)
+        if not value:
+            result["missing"] += 1
+            result["errors"].append({"row": row_idx + 1, "error": f"Missing {key}"})
+            no_key.append(mapped)
+        elif value in seen or value in candidates:
+            result["duplicates"] += 1
+        else:
+            candidates[value] = mapped
+    seen.update(candidates)
+
+    # Then drop keys the collection already has, in one round trip
+    existing = await existing_keys(coll, key, list(candidates))
+    ours = [value for value, doc in existing.items()
+            if id_prefix is not None and doc["_id"] == candidates[value]["_id"]]
+    result["duplicates"] += len(existing) - len(ours)
+    result["resolved"] += sum(1 for value in ours if existing[value].get("telegram_id"))
+    pending = [mapped for value, mapped in candidates.items() if value not in existing]
+
+    resolved = await resolver.resolve_many([mapped[key] for mapped in pending])
+    for mapped in pending:
+        telegram_id, username = resolved.get(mapped[key], (None, None))
+        if telegram_id:
+            mapped["telegram_id"] = telegram_id
+            mapped["telegram_username"] = username
+            result["resolved"] += 1
+
+    # Rows without a phone are stored too, as before, but not reported as inserted.
+    # A duplicate _id here is this job's own row from an interrupted run: already stored.
+    _, no_key_errors, _ = await insert_batches(coll, no_key, key, insert_batch_size)
+    inserted, errors, raced = await insert_batches(coll, pending, key, insert_batch_size)
+    inserted = ours + inserted
+    result["total_inserted"] = len(no_key) - len(no_key_errors) + len(inserted)
+    result["inserted"] = inserted
+    result["duplicates"] += raced
+    result["errors"] = result["errors"] + no_key_errors + errors
+
+    logging.info(f"Import chunk: {len(df)} rows, {len(pending)} new, "
+                 f"{result['resolved']} resolved, {len(inserted)} inserted")
+    return result
+
+
+async def import_chunks(chunks, coll, key: str, resolver, insert_batch_size: int = INSERT_BATCH_SIZE) -> dict:
+    """Import every chunk in order and return the combined summary."""
+    summary = {"rows": 0, "total_inserted": 0, "inserted": [], "missing": 0,
+               "duplicates": 0, "resolved": 0, "errors": []}
+    seen = set()
+    async for df in iter_in_thread(chunks):
+        result = await import_chunk(df, coll, key, resolver, seen, insert_batch_size)
+        for name in ("rows", "total_inserted", "missing", "duplicates", "resolved"):
+            summary[name] += result[name]
+        summary["inserted"].extend(result["inserted"])
+        summary["errors"].extend(result["errors"])
+    return summary
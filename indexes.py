@@ -0,0 +1,109 @@
+# -------------------------------------------------------------
+# indexes.py
+# Index bootstrap for the subscription collections and the hot queries they serve.
+import logging
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Unique only where a value is present: imports store rows without a phone too.
+# $gt "" only matches non-empty strings, and an equality query on a phone implies it,
+# so the planner can use these partial indexes.
+_HAS_PHONE = {"phone": {"$gt": ""}}
+_HAS_MOBILE = {"mobile": {"$gt": ""}}
+
+INDEX_SPECS = {
+    "users": [
+        IndexModel([("phone", ASCENDING)], name="phone_unique", unique=True, partialFilterExpression=_HAS_PHONE),
+        IndexModel([("group_link", ASCENDING), ("joined", ASCENDING), ("link_used", ASCENDING)],
+                   name="group_link_joined_link_used"),
+        IndexModel([("telegram_id", ASCENDING)], name="telegram_id"),
+        IndexModel([("expiry_date", ASCENDING)], name="expiry_date"),
+        IndexModel([("joined", ASCENDING), ("_id", ASCENDING)], name="joined_id"),  # /get-all-users pages
+    ],
+    "log": [
+        IndexModel([("group_link", ASCENDING)], name="group_link"),
+        IndexModel([("phone", ASCENDING)], name="phone"),
+        IndexModel([("telegram_id", ASCENDING)], name="telegram_id"),
+    ],
+    "import_users": [
+        IndexModel([("phone", ASCENDING)], name="phone_unique", unique=True, partialFilterExpression=_HAS_PHONE),
+    ],
+    "temp_users": [
+        IndexModel([("mobile", ASCENDING)], name="mobile_unique", unique=True, partialFilterExpression=_HAS_MOBILE),
+    ],
+    "import_jobs": [
+        IndexModel([("status", ASCENDING)], name="status"),
+    ],
+}
+
+
+def hot_queries(now: datetime = None) -> list:
+    """(collection, filter) for every query on a request or sweep path; checked by check_query_plans.py."""
+    now = now or datetime.now()
+    return [
+        ("users", {"group_link": "https://t.me/+x", "joined": False, "link_used": False}),  # /webhook claim
+        ("users", {"phone": "+910000000000", "joined": True}),                              # /subscribe
+        ("users", {"phone": "+910000000000"}),                                              # /subscribe, /extend-plan
+        ("users", {"phone": "+910000000000", "expiry_date": {"$gt": now}}),                 # /subscribe
+        ("users", {"phone": "+910000000000", "joined": False, "left_group": True,
+                   "expiry_date": {"$gt": now}}),                                           # /re-generate-link-after-leave
+        ("users", {"telegram_id": 1}),                                                      # handle_user_left, kick
+        ("users", {"expiry_date": {"$lt": now}}),                                           # expiry sweep
+        ("users", {"joined": True}),                                                        # /get-all-users counts
+        ("users", {"joined": True, "_id": {"$gt": ObjectId("000000000000000000000000")}}), # /get-all-users pages
+        ("log", {"group_link": "https://t.me/+x"}),                                         # /webhook log upsert
+        ("log", {"phone": "+910000000000"}),                                                # /extend-plan mirror
+        ("log", {"telegram_id": 1}),                                                        # extend_plan_in_db
+        ("import_users", {"phone": {"$in": ["+910000000000"], "$gt": ""}}),                 # import dedupe
+        ("temp_users", {"mobile": {"$in": ["+910000000000"], "$gt": ""}}),                  # import dedupe
+        ("import_jobs", {"status": {"$in": ["queued", "running"]}}),                        # job resume
+    ]
+
+
+# IndexOptionsConflict / IndexKeySpecsConflict: an index on the same key already exists
+# under another name (e.g. a hand-made telegram_id_1), or our name is taken by other keys
+INDEX_CONFLICT_CODES = (85, 86)
+
+
+async def _create(coll, name: str, model: IndexModel) -> str:
+    spec = model.document
+    try:
+        await coll.create_indexes([model])
+        return "ok"
+    except OperationFailure as e:
+        if e.code not in INDEX_CONFLICT_CODES:
+            raise
+        logging.warning(f"Index {name}.{spec['name']} not created, an existing index covers it ({e})")
+        return "existing"
+
+
+async def ensure_indexes(collections: dict) -> list:
+    """
+    Create every index in INDEX_SPECS (no-op when it already exists).
+    An existing index on the same key under another name counts as created.
+    If legacy duplicates block a unique index, fall back to a plain one so the
+    lookups stay indexed, and log it so the data can be cleaned up.
+    Returns (collection, index name, "ok" | "existing" | "non_unique") per spec.
+    """
+    report = []
+    for name, models in INDEX_SPECS.items():
+        coll = collections.get(name)
+        if coll is None:
+            continue
+        for model in models:
+            spec = model.document
+            try:
+                outcome = await _create(coll, name, model)
+            except OperationFailure as e:
+                if not spec.get("unique"):
+                    raise
+                logging.warning(f"Unique index {name}.{spec['name']} not created ({e}); using non-unique index")
+                await _create(coll, name, IndexModel(list(spec["key"].items()),
+                                                     name=spec["name"].replace("_unique", "")))
+                outcome = "non_unique"
+            report.append((name, spec["name"], outcome))
+    logging.info("MongoDB indexes ensured")
+    return report
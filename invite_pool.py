@@ -0,0 +1,89 @@
+# -------------------------------------------------------------
+# invite_pool.py
+# Background pool of pre-created join-request invite links.
+import asyncio
+import collections
+import logging
+import time
+
+
+class InviteLinkPool:
+    """
+    Keeps `target_size` fresh invite links ready so request handlers can pop one
+    in O(1) instead of waiting on createChatInviteLink.
+    Links with less than `min_ttl` seconds of life left are discarded.
+    """
+
+    def __init__(self, create_link, link_ttl: int = 86400, target_size: int = 20,
+                 min_ttl: int = 20 * 3600, refill_concurrency: int = 4, refill_interval: float = 60):
+        self.create_link = create_link
+        self.link_ttl = link_ttl
+        self.target_size = target_size
+        self.min_ttl = min_ttl
+        self.refill_concurrency = refill_concurrency
+        self.refill_interval = refill_interval
+        self._links = collections.deque()  # (link, expire_ts), oldest on the left
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def get(self):
+        """Pop a ready link, or create one on demand when the pool is empty."""
+        self._discard_stale()
+        self._wakeup.set()
+        if self._links:
+            self.hits += 1
+            return self._links.popleft()[0]
+        self.misses += 1
+        return await self.create_link()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._links),
+            "target_size": self.target_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "discarded": self.discarded,
+        }
+
+    def _discard_stale(self):
+        cutoff = time.time() + self.min_ttl
+        while self._links and self._links[0][1] < cutoff:
+            self._links.popleft()
+            self.discarded += 1
+
+    async def _create_one(self):
+        link = await self.create_link()
+        if link:
+            # Expiry is stamped after creation, so it never overstates the link's life.
+            self._links.append((link, time.time() + self.link_ttl - 60))
+
+    async def _refill_loop(self):
+        while True:
+            try:
+                self._discard_stale()
+                missing = self.target_size - len(self._links)
+                while missing > 0:
+                    batch = min(missing, self.refill_concurrency)
+                    await asyncio.gather(*(self._create_one() for _ in range(batch)))
+                    missing -= batch
+            except Exception as e:
+                logging.error(f"Invite pool refill error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,127 @@
+# -------------------------------------------------------------
+# log_config.py
+# JSON logging through a queue: the event loop only enqueues records, a listener
+# thread formats them and writes the rotating file (and stdout).
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# Share of records whose `payload` extra is kept, by level; the message itself is always logged
+DEFAULT_SAMPLE_RATES = {
+    logging.DEBUG: 0.0,
+    logging.INFO: 0.01,
+    logging.WARNING: 1.0,
+    logging.ERROR: 1.0,
+    logging.CRITICAL: 1.0,
+}
+
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class PayloadSampler(logging.Filter):
+    """Drop the `payload` extra from all but a sampled share of records at each level."""
+
+    def __init__(self, rates: dict = None):
+        super().__init__()
+        self.rates = {**DEFAULT_SAMPLE_RATES, **(rates or {})}
+        self.dropped = 0
+
+    def filter(self, record):
+        if hasattr(record, "payload"):
+            rate = self.rates.get(record.levelno, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                del record.payload
+                self.dropped += 1
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Like QueueHandler, but keeps the traceback as its own field instead of folding it into msg."""
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(path: str = None, level: str = None, max_bytes: int = None, backup_count: int = None,
+                  stdout: bool = None, sample_rates: dict = None):
+    """
+    Route the root logger through a queue to a RotatingFileHandler (and stdout).
+    Safe to call more than once; later calls are no-ops. Settings default to
+    LOG_FILE, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_STDOUT and
+    LOG_PAYLOAD_SAMPLE_RATE (the INFO rate).
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    # "{pid}" in the path gives each process its own file (several uvicorn workers)
+    path = (path or os.getenv("LOG_FILE", "app.log")).replace("{pid}", str(os.getpid()))
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    max_bytes = max_bytes or int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    backup_count = backup_count or int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    if stdout is None:
+        stdout = os.getenv("LOG_STDOUT", "True").lower() == "true"
+    if sample_rates is None and os.getenv("LOG_PAYLOAD_SAMPLE_RATE"):
+        sample_rates = {logging.INFO: float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE"))}
+
+    formatter = JsonFormatter()
+    handlers = [logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                     encoding="utf-8")]
+    if stdout:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(PayloadSampler(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush whatever is queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -2,31 +2,42 @@
 # main.py
 from fastapi import FastAPI, HTTPException, File, UploadFile, Request
 from contextlib import asynccontextmanager
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.encoders import jsonable_encoder
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
 import re
 import logging
-import requests
 import asyncio
+import json
+from typing import List, Optional
+from bson import ObjectId
 from pydantic import BaseModel
-from motor.motor_asyncio import AsyncIOMotorClient
 from telethon import TelegramClient
-import pandas as pd
-import io
 import re
 from datetime import datetime
 from util import *
 from scheduler import *
-
-# -------------------- Logging --------------------
-logging.basicConfig(
-    filename='app.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from invite_pool import InviteLinkPool
+from workers import KeyedWorkerPool
+from resolver import PhoneResolver, RESOLVE_BATCH_SIZE
+from resolver_ipc import RemoteResolver, RESOLVER_SOCKET
+from session_pool import SessionPool, TelethonSession
+from update_dedupe import UpdateDeduper
+from poller import UpdatePoller, MAX_BATCH
+from phone_cache import PhoneCache, POSITIVE_TTL, NEGATIVE_TTL
+from importer import read_upload_chunks, import_chunks, IMPORT_CHUNK_SIZE
+from import_jobs import ImportJobManager, JOB_CHUNK_SIZE
+from indexes import ensure_indexes
+from sweeper import ExpirySweeper
+from expiry_timer import ExpiryTimer
+from stats import SubscriptionStats
+from bulk_subscribe import BulkSubscriber
+from pymongo import ReturnDocument
+from database import mongo
+from log_config import setup_logging, stop_logging
+from metrics import REGISTRY, MetricsMiddleware, JOIN_MONGO_SECONDS
 
 # -------------------- Load Env --------------------
 load_dotenv()
@@ -70,92 +81,221 @@ else:
     SESSION_PATH = "telethon_dev_session/user.session"
 
 
+# "local": this process owns the Telethon session (single process, or telethon_service.py).
+# "remote": a uvicorn worker; user-session work goes to telethon_service.py over RESOLVER_SOCKET.
+TELETHON_MODE = os.getenv("TELETHON_MODE", "local")
+TELETHON_REMOTE = TELETHON_MODE == "remote"
+RESOLVER_SOCKET_PATH = os.getenv("RESOLVER_SOCKET", RESOLVER_SOCKET)
+
+# "webhook": Telegram pushes to WEBHOOK_URL/webhook. "polling": the session owner pulls getUpdates
+# (no inbound HTTPS needed; also the fast way to drain a backlog after downtime).
+INGESTION_MODE = os.getenv("INGESTION_MODE", "webhook").lower()
+
 # 🔥 FIX: Make sure folder exists
 os.makedirs(os.path.dirname(SESSION_PATH), exist_ok=True)
 
-# Finally, create Telethon client safely
-client = TelegramClient(SESSION_PATH, API_ID, API_HASH)
-telethon_client = client
-
+# Finally, create Telethon client safely (only the owner may open the SQLite session)
+client = None if TELETHON_REMOTE else TelegramClient(SESSION_PATH, API_ID, API_HASH)
 
-# ---- Validate ----
-if not BOT_USERNAME:
-    logging.warning("BOT_USERNAME not set in .env")
+# More already-logged-in accounts to spread contact lookups over (comma-separated .session paths)
+EXTRA_SESSION_PATHS = [p.strip() for p in os.getenv("TELETHON_EXTRA_SESSIONS", "").split(",") if p.strip()]
+extra_clients = {} if TELETHON_REMOTE else {
+    path: TelegramClient(path, API_ID, API_HASH) for path in EXTRA_SESSION_PATHS
+}
+telethon_client = client
 
-print("IS_PROD:", IS_PROD)
-print("BOT_TOKEN:", BOT_TOKEN)
-print("WEBHOOK_URL:", WEBHOOK_URL)
-print("GROUP_CHAT_ID:", GROUP_CHAT_ID)
-print("PHONE:", PHONE)
 
 # -------------------- MongoDB --------------------
-mongo_client = AsyncIOMotorClient(MONGO_URI)
-db = mongo_client[DB]
-users_collection = db[USER_COLLECTION]
-log_collection = db[LOG_COLLECTION]
-import_users_coll = db[IMPORT_USERS_COLLECTION]
-rest_users_coll = db[REST_USERS_COLLECTION]
-temp_users_coll = db[TEMP_USERS_COLLECTION]
-more_new_users_coll = db[MORE_NEW_USERS_COLLECTION]
+# One pool for the whole process (database.py); the client itself is created in lifespan
+users_collection = mongo.collection(USER_COLLECTION)
+log_collection = mongo.collection(LOG_COLLECTION)
+import_users_coll = mongo.collection(IMPORT_USERS_COLLECTION)
+rest_users_coll = mongo.collection(REST_USERS_COLLECTION)
+temp_users_coll = mongo.collection(TEMP_USERS_COLLECTION)
+more_new_users_coll = mongo.collection(MORE_NEW_USERS_COLLECTION)
+phone_cache_coll = mongo.collection(os.getenv("PHONE_CACHE_COLLECTION", "phone_cache"))
+import_jobs_coll = mongo.collection(os.getenv("IMPORT_JOBS_COLLECTION", "import_jobs"))
+counters_coll = mongo.collection(os.getenv("COUNTERS_COLLECTION", "counters"))
+processed_updates_coll = mongo.collection(os.getenv("PROCESSED_UPDATES_COLLECTION", "processed_updates"))
+bot_state_coll = mongo.collection(os.getenv("BOT_STATE_COLLECTION", "bot_state"))
+
+# O(1) subscription counters, kept current by every status change below
+subscription_stats = SubscriptionStats(
+    users_collection,
+    counters_coll,
+    reconcile_interval=int(os.getenv("STATS_RECONCILE_INTERVAL", "900")),
+)
 
 
 # -------------------- Helpers --------------------
 def validate_phone(phone: str) -> bool:
     return bool(re.match(r'^\+[1-9]\d{1,14}$', phone))
 
-async def _tg_get(url: str):
-    return await asyncio.to_thread(requests.get, url)
-
-async def approve_join_request(user_id: int):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/approveChatJoinRequest?chat_id={GROUP_CHAT_ID}&user_id={user_id}"
-    await _tg_get(url)
+async def approve_join_request(user_id: int) -> bool:
+    """True once Telegram accepted the approval; error bodies (incl. 429 after retries) come back as False."""
+    result = await dispatcher.submit("approveChatJoinRequest", {"chat_id": GROUP_CHAT_ID, "user_id": user_id})
+    if not result.get("ok"):
+        logging.error(f"approveChatJoinRequest failed for {user_id}: {result.get('description')}")
+        return False
+    return True
 
 async def decline_join_request(user_id: int):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/declineChatJoinRequest?chat_id={GROUP_CHAT_ID}&user_id={user_id}"
-    await _tg_get(url)
+    await dispatcher.submit("declineChatJoinRequest", {"chat_id": GROUP_CHAT_ID, "user_id": user_id})
 
 async def revoke_invite_link(link: str):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/revokeChatInviteLink?chat_id={GROUP_CHAT_ID}&invite_link={link}"
-    await _tg_get(url)
+    await dispatcher.submit("revokeChatInviteLink", {"chat_id": GROUP_CHAT_ID, "invite_link": link})
+
+# Ready-made join-request links for /subscribe, /extend-plan and link regeneration
+invite_pool = InviteLinkPool(
+    create_temp_invite_link,
+    link_ttl=INVITE_LINK_TTL,
+    target_size=int(os.getenv("INVITE_POOL_SIZE", "20")),
+    min_ttl=int(os.getenv("INVITE_POOL_MIN_TTL", str(20 * 3600))),
+)
 
 # -------------------- Lifespan --------------------
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def start_core():
+    """Logging, Mongo pool and Bot API client + outbound queue: every process needs these."""
+    # JSON lines via a queue listener thread: app.log (rotated) + stdout.
+    # Started here, not at import, so importing main has no side effects.
+    setup_logging()
+
+    # ---- Validate ----
+    if not BOT_USERNAME:
+        logging.warning("BOT_USERNAME not set in .env")
+    logging.info("Config loaded", extra={"is_prod": IS_PROD, "webhook_url": WEBHOOK_URL,
+                                         "group_chat_id": GROUP_CHAT_ID})
+
+    # Shared MongoDB pool, created here rather than at import time
+    mongo.connect()
+    audit_log.start()
+
+    # Shared Bot API connection pool
+    await bot_api.start()
+    dispatcher.start()
+
+
+async def stop_core():
+    await audit_log.stop()  # last flush while the pool is still open
+    mongo.close()
+    await dispatcher.stop()
+    await bot_api.close()
+
+
+async def start_owner():
+    """
+    Telethon session, its ChatAction handler and the once-per-deployment jobs
+    (indexes, import resume, expiry, counters, webhook). Runs in the single
+    process in local mode, or in telethon_service.py beside remote workers.
+    """
     # Start Telethon
     await client.start(phone=PHONE)
-    print("Telethon started")
+    logging.info("Telethon started")
 
     if not await client.is_user_authorized():
         raise Exception("❌ ERROR: Telethon session invalid. Generate user.session again.")
 
-    print("✅ Telethon autologin success")
+    logging.info("Telethon autologin success")
 
     # Run Telethon event loop in background
+    client.add_event_handler(handle_user_left, events.ChatAction)
     asyncio.create_task(client.run_until_disconnected())
 
+    # Lookup-only sessions: no interactive login here, they must already be authorized
+    for path, extra in extra_clients.items():
+        try:
+            await extra.connect()
+            if not await extra.is_user_authorized():
+                raise RuntimeError("session not authorized")
+        except Exception as e:
+            logging.error(f"Telethon session {path} not added to the pool: {e}")
+            continue
+        session_pool.add(TelethonSession(os.path.basename(path), extra))
+    logging.info(f"Contact lookups over {len(session_pool.sessions)} Telethon session(s)")
+
+    await ensure_indexes({
+        "users": users_collection,
+        "log": log_collection,
+        "import_users": import_users_coll,
+        "temp_users": temp_users_coll,
+        "import_jobs": import_jobs_coll,
+    })
+    await phone_cache.ensure_indexes()
+    await update_deduper.ensure_indexes()
+    await import_jobs.resume_pending()
+
     # Start expiry checker
-    start_expiry_check()
+    start_expiry_check(expiry_sweeper.run)
+    expiry_timer.start()
+    subscription_stats.start()
+
+    if INGESTION_MODE == "polling":
+        # getUpdates is refused while a webhook is registered
+        await bot_api.call("deleteWebhook")
+        await poller.start()
+    else:
+        # Setup Webhook
+        webhook_url = f"{WEBHOOK_URL}/webhook"
+        await bot_api.call("setWebhook", {"url": webhook_url})
+        logging.info("Webhook set")
+
+
+async def stop_owner():
+    stop_expiry_check()
+    await expiry_timer.stop()
+    await subscription_stats.stop()
+    await import_jobs.stop()
+    await client.disconnect()
+    for extra in extra_clients.values():
+        await extra.disconnect()
+    if INGESTION_MODE != "polling":
+        await bot_api.call("deleteWebhook")
 
-    # Setup Webhook
-    webhook_url = f"{WEBHOOK_URL}/webhook"
-    await _tg_get(f"https://api.telegram.org/bot{BOT_TOKEN}/setWebhook?url={webhook_url}")
-    logging.info("Webhook set")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_core()
+    invite_pool.start()
+    join_workers.start()
+    if TELETHON_REMOTE:
+        logging.info(f"Telethon work goes to the session owner at {RESOLVER_SOCKET_PATH}")
+    else:
+        await start_owner()
 
     yield
 
     # Shutdown
-    await client.disconnect()
-    mongo_client.close()
-    await _tg_get(f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook")
+    await poller.stop()  # before the join workers, so nothing is submitted after they drain
+    await join_workers.stop()
+    await asyncio.gather(*join_followups, return_exceptions=True)  # bounded by JOIN_VERIFY_TIMEOUT
+    await invite_pool.stop()
+    if TELETHON_REMOTE:
+        await phone_resolver.close()
+    else:
+        await stop_owner()
+    await stop_core()
+    stop_logging()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+# Scrape-time gauges: read current state, nothing added to the request path
+REGISTRY.gauge("dispatcher_queue_depth", "Outbound Bot API jobs waiting", lambda: dispatcher.queue_depth)
+REGISTRY.gauge("join_queue_depth", "Join requests waiting for a worker", lambda: join_workers.depth)
+REGISTRY.gauge("audit_log_buffer_depth", "log_collection writes waiting to be flushed", lambda: audit_log.depth)
+REGISTRY.gauge("mongo_pool_checked_out", "MongoDB connections in use", lambda: mongo.pool_stats.checked_out)
+REGISTRY.gauge("mongo_pool_wait_seconds_max", "Longest MongoDB connection checkout wait",
+               lambda: mongo.pool_stats.wait_seconds_max)
 
 # -------------------- Models --------------------
 class SubscribeRequest(BaseModel):
     phone: str
     duration_days: int
 
+class BulkSubscribeRequest(BaseModel):
+    items: List[SubscribeRequest]
+
 class RegenerateLink(BaseModel):
     phone: str
 
@@ -163,110 +303,184 @@ class PhoneCheckRequest(BaseModel):
     phone: str
 
 # ==================== WEBHOOK – AUTO APPROVE + SAVE telegram_id ====================
-@app.post("/webhook")
-async def webhook(request: Request):
+# Upper bound on the detached same-user phone re-check after an approval
+JOIN_VERIFY_TIMEOUT = float(os.getenv("JOIN_VERIFY_TIMEOUT", "30"))
+join_followups = set()
+
+
+async def verify_join(sub: dict, update_data: dict, user_id: int, group_link: str):
+    """
+    Same-user phone re-check plus the counter and log follow-up for one approved join.
+    Skipped while every Telethon session is in FloodWait and capped at JOIN_VERIFY_TIMEOUT;
+    a join that could not be checked is stored with phone_verified=False.
+    """
+    update_data = dict(update_data)
+    fetched = None
+    if phone_resolver.flood_wait_remaining > 0:
+        logging.warning(f"Phone re-check skipped for {sub['phone']}: FloodWait "
+                        f"{phone_resolver.flood_wait_remaining:.0f}s")
+    else:
+        try:
+            # Fetch Telegram ID by phone again (may return None if privacy = Nobody)
+            fetched = await asyncio.wait_for(get_telegram_id_by_phone(sub["phone"]), JOIN_VERIFY_TIMEOUT)
+            logging.debug(f"Re-resolved {sub['phone']} -> {fetched[0]}")
+        except asyncio.TimeoutError:
+            logging.warning(f"Phone re-check for {sub['phone']} timed out after {JOIN_VERIFY_TIMEOUT}s")
+        except Exception as e:
+            logging.error(f"Re-resolve failed for {sub['phone']}: {e}")
+
+    if fetched is None:
+        update_data["phone_verified"] = False
+    else:
+        # Determine if same user joined
+        fetched_tid = fetched[0]
+        update_data["phone_verified"] = True
+        update_data["same_user_join"] = (fetched_tid is not None and fetched_tid == user_id)
+        update_data["privacy_nobody"] = (fetched_tid is None)
+
+    # Prepare proper log document (buffered, audit_log.py)
+    log_doc = {
+        "group_link": group_link,
+        **update_data
+    }
+    logging.debug("Join log document", extra={"payload": log_doc})
+    audit_log.update({"group_link": group_link}, log_doc, upsert=True)
+
+    # One concurrent round: the verification fields and a single $inc carrying both
+    # the status and the privacy change
+    follow_up = {name: update_data[name] for name in ("phone_verified", "same_user_join", "privacy_nobody")
+                 if name in update_data}
     try:
-        update = await request.json()
-        logging.info(f"Webhook update: {update}")
+        with JOIN_MONGO_SECONDS.time("follow_up"):
+            await asyncio.gather(
+                users_collection.update_one({"_id": sub["_id"]}, {"$set": follow_up}),
+                subscription_stats.changed(sub, {**sub, **update_data}),
+            )
+    except Exception as e:
+        logging.error(f"Join follow-up save failed for {group_link}: {e}")
+
+
+async def process_join_request(req: dict):
+    """Claim/approve/revoke for one chat_join_request (runs on join_workers); verification is detached."""
+    user_id = req["from"]["id"]
+    username = req["from"].get("username", "")
+    group_link = req.get("invite_link", {}).get("invite_link", "")
+
+    # Claim the link atomically: of two concurrent requests on one link, only one gets the document
+    update_data = {
+        "joined": True,
+        "telegram_id": user_id,
+        "username": username,
+        "left_group": False,
+        "left_at": None,
+        "link_used": True
+    }
+    with JOIN_MONGO_SECONDS.time("claim"):
+        sub = await users_collection.find_one_and_update(
+            {"group_link": group_link, "joined": False, "link_used": False},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE,
+        )
+    if not sub:
+        await decline_join_request(user_id)
+        await telegram_bot_sendtext("This link is invalid or already used.", user_id)
+        return
 
-        if "chat_join_request" not in update:
-            return {"ok": True}
+    # APPROVE
+    try:
+        approved = await approve_join_request(user_id)
+    except Exception as e:
+        logging.error(f"Approve failed for {user_id}: {e}")
+        approved = False
+    if not approved:
+        # Not approved: hand the link back so the user can request again; no revoke, no welcome
+        logging.warning(f"Releasing {group_link} after failed approve for {user_id}")
+        await users_collection.update_one(
+            {"_id": sub["_id"]},
+            {"$set": {field: sub.get(field) for field in update_data}},
+        )
+        return
 
-        req = update["chat_join_request"]
-        chat_id = req["chat"]["id"]
-        user_id = req["from"]["id"]
-        username = req["from"].get("username", "")
-        group_link = req.get("invite_link", {}).get("invite_link", "")
+    # Phone re-check and counter/log follow-up run detached: a FloodWait there must
+    # never hold a join worker (and every approval queued behind it)
+    task = asyncio.create_task(verify_join(sub, update_data, user_id, group_link))
+    join_followups.add(task)
+    task.add_done_callback(join_followups.discard)
 
+    # REVOKE one-time link
+    try:
+        await revoke_invite_link(group_link)
+        logging.debug(f"Revoked {group_link}")
+    except:
+        pass
 
-        print("chat_id", chat_id)
-        print("user_id", user_id)
-        print("username", username)
-        print("group_link", group_link)
-        print("req", req)
-        print("update", update)
-        
-        
-        if chat_id != int(GROUP_CHAT_ID):
-            return {"ok": True}
+    await telegram_bot_sendtext("Welcome! Your subscription is active.", user_id)
+    logging.info(f"User {user_id} joined via group_link")
 
-        # Find subscription by invite_link
-        sub = await users_collection.find_one({"group_link": group_link, "joined": False, "link_used": False})
-        if not sub:
-            await decline_join_request(user_id)
-            await telegram_bot_sendtext("This link is invalid or already used.", user_id)
-            return {"ok": True}
 
-        # APPROVE
-        await approve_join_request(user_id)
+# Join requests are keyed by user id, so one user's requests run in order
+join_workers = KeyedWorkerPool(
+    process_join_request,
+    workers=int(os.getenv("JOIN_WORKERS", "8")),
+    maxsize=int(os.getenv("JOIN_QUEUE_SIZE", "10000")),
+    name="join_request",
+)
 
-        # SAVE telegram_id
-        update_data = {
-            "joined": True,
-            "telegram_id": user_id,
-            "username": username,
-            "left_group": False,
-            "left_at": None,
-            "link_used": True
-        }
-        await users_collection.update_one(
-            {"group_link": group_link},
-            {"$set": update_data}
-        )
 
-       # Check same user join which have link created
-        try:
-            get_same_user = await users_collection.find_one({"group_link": group_link})
-            print("get_same_user", get_same_user)
+# Redelivered updates are dropped by update_id before any processing
+update_deduper = UpdateDeduper(
+    processed_updates_coll,
+    capacity=int(os.getenv("UPDATE_DEDUPE_SIZE", "10000")),
+)
 
-            # Fetch Telegram ID by phone again (may return None if privacy = Nobody)
-            fetched_tid, fetched_username = await get_telegram_id_by_phone(get_same_user["phone"])
-            print("get_same_user['phone']", get_same_user["phone"])
-            print("fetched_tid", fetched_tid)
-
-            # Determine if same user joined
-            same_user = (fetched_tid is not None and fetched_tid == get_same_user["telegram_id"])
-            update_data["same_user_join"] = same_user
-            update_data["privacy_nobody"] = (fetched_tid is None)
-
-            # Update user record
-            await users_collection.update_one(
-                {"group_link": group_link},
-                {"$set": {
-                    "same_user_join": same_user,
-                    "privacy_nobody": update_data["privacy_nobody"]
-                }}
-            )
 
-            # Prepare proper log document
-            log_doc = {
-                "group_link": group_link,
-                **update_data
-            }
+async def handle_update(update: dict) -> bool:
+    """Filter, dedupe and enqueue one update; False if the join queue is full (retry later)."""
+    if "chat_join_request" not in update:
+        return True
 
-            print("update_data", update_data)
-            print("log_doc", log_doc)
+    req = update["chat_join_request"]
+    chat_id = req["chat"]["id"]
+    user_id = req["from"]["id"]
 
-            # Update log entry (or create if missing)
-            await log_collection.update_one(
-                {"group_link": group_link},
-                {"$set": log_doc},
-                upsert=True
-            )
+    if chat_id != int(GROUP_CHAT_ID):
+        return True
 
-        except Exception as e:
-            print("log saving error:", str(e))
-            pass
+    update_id = update.get("update_id")
+    if update_id is not None and await update_deduper.is_duplicate(update_id):
+        logging.info(f"Duplicate update {update_id} dropped")
+        return True
 
-        # REVOKE one-time link
-        try:
-            await revoke_invite_link(group_link)
-            print("revoke_invite_link +++++++++++++++")
-        except:
-            pass
+    if not join_workers.submit(user_id, req):
+        # Not taken: the redelivery must not count as a duplicate
+        if update_id is not None:
+            await update_deduper.forget(update_id)
+        logging.warning(f"Join queue full, deferring user {user_id}")
+        return False
+    return True
+
+
+# Pull-based alternative to /webhook (INGESTION_MODE=polling), started in start_owner()
+poller = UpdatePoller(
+    bot_api,
+    handle_update,
+    bot_state_coll,
+    limit=int(os.getenv("GETUPDATES_LIMIT", str(MAX_BATCH))),
+    timeout=int(os.getenv("GETUPDATES_TIMEOUT", "30")),
+)
 
-        await telegram_bot_sendtext("Welcome! Your subscription is active.", user_id)
-        logging.info(f"User {user_id} joined via group_link")
+
+@app.post("/webhook")
+async def webhook(request: Request):
+    """Validate and enqueue; Telegram gets its 200 before any processing happens."""
+    try:
+        update = await request.json()
+        # Full update only on a sampled share of records (log_config.PayloadSampler)
+        logging.info("Webhook update", extra={"update_id": update.get("update_id"), "payload": update})
+
+        if not await handle_update(update):
+            # Backlog full: let Telegram redeliver later instead of dropping it
+            return JSONResponse(status_code=503, content={"ok": False})
 
         return {"ok": True}
 
@@ -278,10 +492,9 @@ async def webhook(request: Request):
 # -------------------- Telethon Event: User Left Group --------------------
 from telethon import events
 
-@client.on(events.ChatAction)
+# Registered on the client in start_owner()
 async def handle_user_left(event):
     try:
-        print("running handle_user_left...")
 
         if not (event.user_left or event.user_kicked):
             return
@@ -290,67 +503,108 @@ async def handle_user_left(event):
 
         # FIX: Telethon returns bare ID without -100 prefix
         real_group_id = f"-100{chat.id}"
-        print("real_group_id", real_group_id)
-        print("env GROUP_CHAT_ID", GROUP_CHAT_ID)
 
         if str(real_group_id) != str(GROUP_CHAT_ID):
-            print("❌ Not matching group id, skipping...")
+            logging.debug(f"ChatAction for {real_group_id} is not our group, skipping")
             return
 
         user = await event.get_user()
         telegram_id = user.id
 
-        print("left group telegram id", telegram_id)
-
         update_data = {
             "joined": False,
             "left_group": True,
             "left_at": datetime.utcnow(),
         }
 
-        result = await users_collection.update_one(
+        before = await users_collection.find_one_and_update(
             {"telegram_id": telegram_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"joined": 1, "left_group": 1, "privacy_nobody": 1},
+            return_document=ReturnDocument.BEFORE,
         )
+        if before:
+            await subscription_stats.changed(before, {**before, **update_data})
 
-        print("update result", result.modified_count)
-
-        print(f"🚨 User Left: {telegram_id}")
+        logging.info(f"User left: {telegram_id} (subscription found: {before is not None})")
 
     except Exception as e:
-        print("Left event error:", e)
+        logging.error(f"Left event error: {e}", exc_info=True)
+
 
 
+# Cached, batched phone -> Telegram ID lookups over the user session
+phone_cache = PhoneCache(
+    phone_cache_coll,
+    max_entries=int(os.getenv("PHONE_CACHE_SIZE", "50000")),
+    ttl=int(os.getenv("PHONE_CACHE_TTL", str(POSITIVE_TTL))),
+    negative_ttl=int(os.getenv("PHONE_CACHE_NEGATIVE_TTL", str(NEGATIVE_TTL))),
+)
+if TELETHON_REMOTE:
+    phone_resolver = RemoteResolver(RESOLVER_SOCKET_PATH)
+else:
+    session_pool = SessionPool(
+        [TelethonSession(os.path.basename(SESSION_PATH), client)],
+        max_inflight=int(os.getenv("TELETHON_SESSION_INFLIGHT", "1")),
+    )
+    phone_resolver = PhoneResolver(
+        session_pool,
+        batch_size=int(os.getenv("RESOLVE_BATCH_SIZE", str(RESOLVE_BATCH_SIZE))),
+        cache=phone_cache,
+    )
+
 
 async def get_telegram_id_by_phone(phone: str):
     """
     Import a phone contact, return Telegram ID and username if exists.
     Handles FloodWait automatically.
     """
-    try:
-        contact = InputPhoneContact(client_id=0, phone=phone, first_name="Temp", last_name="Temp")
-
-        while True:
-            try:
-                result = await client(ImportContactsRequest([contact]))
-                if result.users:
-                    user = result.users[0]
-                    await client(DeleteContactsRequest(id=[user.id]))  # optional cleanup
-                    return user.id, getattr(user, "username", None)
-                return None, None
-
-            except FloodWaitError as e:
-                wait_time = e.seconds + 2
-                print(f"⚠️ FloodWait: sleeping for {wait_time} seconds...")
-                await asyncio.sleep(wait_time)
-
-    except PhoneNumberInvalidError:
-        print(f"❌ Invalid phone number: {phone}")
-        return None, None
+    return await phone_resolver.resolve(phone)
+
+
+# Long-running uploads run as resumable background jobs
+import_jobs = ImportJobManager(
+    import_jobs_coll,
+    phone_resolver,
+    targets={
+        "import_users": (import_users_coll, "phone"),
+        "temp_users": (temp_users_coll, "mobile"),
+    },
+    upload_dir=os.getenv("IMPORT_UPLOAD_DIR", "import_uploads"),
+    chunk_size=int(os.getenv("IMPORT_JOB_CHUNK_SIZE", str(JOB_CHUNK_SIZE))),
+    # Workers hand background jobs to the session owner, which has the resolver locally
+    run_remote=(lambda job_id: phone_resolver.call("run_import_job", job_id=job_id)) if TELETHON_REMOTE else None,
+)
 
-    except Exception as e:
-        print(f"⚠️ Unexpected error fetching {phone}: {e}")
-        return None, None
+# Expired-subscription sweep on the app's Motor client
+expiry_sweeper = ExpirySweeper(
+    users_collection,
+    kick_user,
+    concurrency=int(os.getenv("SWEEP_CONCURRENCY", "10")),
+    delete_batch=int(os.getenv("SWEEP_DELETE_BATCH", "500")),
+    on_removed=subscription_stats.removed,
+)
+
+# Precise per-user expiry; the daily sweep above stays as the safety net
+expiry_timer = ExpiryTimer(
+    users_collection,
+    expiry_sweeper.expire_one,
+    horizon=int(os.getenv("EXPIRY_TIMER_HORIZON", "3600")),
+    reload_interval=int(os.getenv("EXPIRY_TIMER_RELOAD", "600")),
+)
+
+# Many /subscribe or /extend-plan items per request: one lookup, one bulk write
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+bulk_subscriber = BulkSubscriber(
+    users_collection,
+    audit_log,
+    invite_pool,
+    expiry_timer,
+    subscription_stats,
+    notify=telegram_bot_sendtext,
+    validate_phone=validate_phone,
+    link_concurrency=int(os.getenv("BULK_LINK_CONCURRENCY", "8")),
+)
 
 
 # ==================== ENDPOINTS ====================
@@ -374,17 +628,15 @@ async def subscribe(req: SubscribeRequest):
 
 
         exist_user =  await users_collection.find_one({"phone": phone})
-        print("exist_user", exist_user)
         if not exist_user:
             # Create one-time join-request link
-            group_link = create_temp_invite_link()
+            group_link = await invite_pool.get()
             if not group_link:
-                print("group_link", group_link)
+                logging.error(f"No invite link available for {phone}")
                 return JSONResponse(status_code=500, content={"status_code":0, "message":"Failed to create link"})
 
             expiry = datetime.now() + timedelta(days=days)
 
-            print("expiry", expiry)
             doc = {
                 "phone": phone,
                 "group_link": group_link,
@@ -398,7 +650,9 @@ async def subscribe(req: SubscribeRequest):
             }
             
             await users_collection.insert_one(doc)
-            await log_collection.insert_one(doc.copy())
+            audit_log.insert(doc.copy())
+            expiry_timer.schedule(doc["_id"], expiry)
+            await subscription_stats.added(doc)
 
             # Remove _id before sending response
             doc.pop("_id", None)
@@ -452,10 +706,11 @@ async def extend(req: SubscribeRequest):
             #     update["group_link"] = new_link
 
             await users_collection.update_one({"phone": phone}, {"$set": update})
-            await log_collection.update_one({"phone": phone}, {"$set": update})
+            audit_log.update({"phone": phone}, update)
+            expiry_timer.schedule(user["_id"], new_expiry)
 
             if user and user.get("telegram_id"):
-                telegram_bot_sendtext(f"Plan extended to {new_expiry:%Y-%m-%d}", user["telegram_id"])
+                await telegram_bot_sendtext(f"Plan extended to {new_expiry:%Y-%m-%d}", user["telegram_id"])
 
             return JSONResponse(status_code=200, content={
                 "status_code": 1,
@@ -465,9 +720,9 @@ async def extend(req: SubscribeRequest):
         
         else:
             # Create one-time join-request link
-            group_link = create_temp_invite_link()
+            group_link = await invite_pool.get()
             if not group_link:
-                print("group_link", group_link)
+                logging.error(f"No invite link available for {phone}")
                 return JSONResponse(status_code=500, content={"status_code":0, "message":"Failed to create link"})
 
             expiry = datetime.now() + timedelta(days=days)
@@ -485,7 +740,9 @@ async def extend(req: SubscribeRequest):
             }
             
             await users_collection.insert_one(doc)
-            await log_collection.insert_one(doc.copy())
+            audit_log.insert(doc.copy())
+            expiry_timer.schedule(doc["_id"], expiry)
+            await subscription_stats.added(doc)
 
             # Remove _id before sending response
             doc.pop("_id", None)
@@ -505,6 +762,40 @@ async def extend(req: SubscribeRequest):
 
 
 
+def bulk_response(results: list) -> JSONResponse:
+    ok = sum(1 for r in results if r["status_code"] == 1)
+    return JSONResponse(status_code=200, content={
+        "status_code": 1,
+        "ok": ok,
+        "failed": len(results) - ok,
+        "results": jsonable_encoder(results),
+    })
+
+
+@app.post("/subscribe-bulk")
+async def subscribe_bulk(req: BulkSubscribeRequest):
+    """/subscribe for up to BULK_MAX_ITEMS phones; one result per item, in order."""
+    if not req.items or len(req.items) > BULK_MAX_ITEMS:
+        return JSONResponse(status_code=400, content={"status_code": 0, "message": f"Send 1-{BULK_MAX_ITEMS} items"})
+    try:
+        return bulk_response(await bulk_subscriber.subscribe(req.items))
+    except Exception as e:
+        logging.error(f"Bulk subscribe error: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"status_code": 0, "message": str(e)})
+
+
+@app.post("/extend-plan-bulk")
+async def extend_bulk(req: BulkSubscribeRequest):
+    """/extend-plan for up to BULK_MAX_ITEMS phones; one result per item, in order."""
+    if not req.items or len(req.items) > BULK_MAX_ITEMS:
+        return JSONResponse(status_code=400, content={"status_code": 0, "message": f"Send 1-{BULK_MAX_ITEMS} items"})
+    try:
+        return bulk_response(await bulk_subscriber.extend(req.items))
+    except Exception as e:
+        logging.error(f"Bulk extend error: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"status_code": 0, "message": str(e)})
+
+
 @app.post("/re-generate-link-after-leave")
 async def re_generate_link_after_leave(req: RegenerateLink):
     try:
@@ -517,9 +808,9 @@ async def re_generate_link_after_leave(req: RegenerateLink):
 
         if await users_collection.find_one({"phone": phone, "joined": False, "left_group": True,"expiry_date": {"$gt": datetime.now()}}):
             # Create one-time join-request link
-            group_link = create_temp_invite_link()
+            group_link = await invite_pool.get()
             if not group_link:
-                print("group_link", group_link)
+                logging.error(f"No invite link available for {phone}")
                 return JSONResponse(status_code=500, content={"status_code":0, "message":"Failed to create link"})
 
             await users_collection.update_one({"phone": phone},{"$set": {"group_link": group_link, "link_used": False}})
@@ -533,19 +824,61 @@ async def re_generate_link_after_leave(req: RegenerateLink):
 
 
 # ---- Admin Endpoints ----
+USER_STATUS_FILTERS = {"all": {}, "joined": {"joined": True}, "pending": {"joined": False}}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # ObjectId and anything else BSON-specific
+
+
 @app.get("/get-all-users")
-async def get_all():
-    joined = [u async for u in users_collection.find({"joined": True})]
-    pending = [u async for u in users_collection.find({"joined": False})]
-    for u in joined + pending:
+async def get_all(status: str = "all", limit: int = 100, after: Optional[str] = None,
+                  fields: Optional[str] = None, left_group: Optional[bool] = None,
+                  expires_before: Optional[datetime] = None, format: str = "json"):
+    """
+    Keyset-paginated user listing (pass next_cursor back as `after`).
+    fields=phone,expiry_date projects; format=ndjson streams every match line by line.
+    """
+    if status not in USER_STATUS_FILTERS or format not in ("json", "ndjson"):
+        return JSONResponse(status_code=400, content={"status_code": 0, "message": "Invalid status or format"})
+
+    query = dict(USER_STATUS_FILTERS[status])
+    if left_group is not None:
+        query["left_group"] = left_group
+    if expires_before is not None:
+        query["expiry_date"] = {"$lt": expires_before}
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except Exception:
+            return JSONResponse(status_code=400, content={"status_code": 0, "message": "Invalid cursor"})
+    projection = {name.strip(): 1 for name in fields.split(",") if name.strip()} if fields else None
+
+    if format == "ndjson":
+        async def stream():
+            cursor = users_collection.find(query, projection).sort("_id", 1).batch_size(500)
+            async for u in cursor:
+                yield json.dumps(u, default=_json_default) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    limit = max(1, min(limit, 1000))
+    users = await users_collection.find(query, projection).sort("_id", 1).limit(limit).to_list(limit)
+    joined, pending = await asyncio.gather(
+        users_collection.count_documents({"joined": True}),
+        users_collection.count_documents({"joined": False}),
+    )
+    for u in users:
         u["_id"] = str(u["_id"])
     return JSONResponse(status_code=200, content={
         "status_code": 1,
         "data": {
-            "joined": len(joined),
-            "pending": len(pending),
-            "joined_users": jsonable_encoder(joined),
-            "pending_users": jsonable_encoder(pending)
+            "joined": joined,
+            "pending": pending,
+            "users": jsonable_encoder(users),
+            "next_cursor": users[-1]["_id"] if len(users) == limit else None,
         }
     })
 
@@ -554,87 +887,175 @@ async def kick(telegram_id: int):
     user = await users_collection.find_one({"telegram_id": telegram_id})
     if not user:
         return JSONResponse(status_code=404, content={"status_code":0, "message":"Not found"})
-    kick_user(telegram_id)
+    await kick_user(telegram_id)
     # await users_collection.delete_one({"telegram_id": telegram_id})
     await users_collection.delete_one(
             {"telegram_id": telegram_id}
         )
+    await subscription_stats.removed([user])
     return JSONResponse(status_code=200, content={"status_code":1})
 
+# With several uvicorn workers (start.sh) each worker has its own dispatcher, invite
+# pool, join workers, audit buffer and deduper, so those endpoints report the worker
+# that served the request ("process") plus the session owner's copy ("owner").
+# The expiry timer and poller only run in the owner, so those endpoints report it.
+PROCESS_LABEL = f"web-{os.getpid()}" if TELETHON_REMOTE else None
+
+
+def process_stats() -> dict:
+    return {
+        "dispatcher": dispatcher.stats(),
+        "invite_pool": invite_pool.stats(),
+        "join_workers": join_workers.stats(),
+        "audit_log": audit_log.stats(),
+        "update_dedupe": update_deduper.stats(),
+        "expiry_timer": expiry_timer.stats(),
+        "poller": {"mode": INGESTION_MODE, **poller.stats()},
+    }
+
+
+async def owner_stats() -> Optional[dict]:
+    """The session owner's process_stats() (served by telethon_service.py in remote mode)."""
+    if not TELETHON_REMOTE:
+        return process_stats()
+    try:
+        return await phone_resolver.call("stats")
+    except Exception as e:
+        logging.warning(f"Owner stats unavailable: {e}")
+        return None
+
+
+async def stats_response(name: str) -> JSONResponse:
+    content = {"status_code": 1, "data": process_stats()[name]}
+    if TELETHON_REMOTE:
+        owner = await owner_stats()
+        content["process"] = PROCESS_LABEL
+        content["owner"] = owner[name] if owner else None
+    return JSONResponse(status_code=200, content=content)
+
+
+async def owner_stats_response(name: str) -> JSONResponse:
+    owner = await owner_stats()
+    if owner is None:
+        return JSONResponse(status_code=503, content={"status_code": 0, "message": "Session owner unavailable"})
+    return JSONResponse(status_code=200, content={"status_code": 1, "data": owner[name]})
+
+
+async def owner_metrics() -> list:
+    """This process's metric families labelled process="owner" (fetched by workers for /metrics)."""
+    return REGISTRY.families("owner")
+
+
+@app.get("/dispatcher-stats")
+async def dispatcher_stats():
+    return await stats_response("dispatcher")
+
+@app.get("/invite-pool-stats")
+async def invite_pool_stats():
+    return await stats_response("invite_pool")
+
+@app.get("/join-worker-stats")
+async def join_worker_stats():
+    return await stats_response("join_workers")
+
+@app.get("/phone-cache-stats")
+async def phone_cache_stats():
+    data = (await phone_resolver.status())["cache"]  # held by the session owner
+    return JSONResponse(status_code=200, content={"status_code": 1, "data": data})
+
+@app.get("/mongo-pool-stats")
+async def mongo_pool_stats():
+    """Connection pool size, checkouts and checkout wait times."""
+    return JSONResponse(status_code=200, content={"status_code": 1, "data": mongo.stats()})
+
+@app.get("/telethon-sessions")
+async def telethon_sessions():
+    """Per-session lookup counts, FloodWait state and errors."""
+    data = (await phone_resolver.status())["sessions"]
+    return JSONResponse(status_code=200, content={"status_code": 1, "data": data})
+
+@app.get("/poller-stats")
+async def poller_stats():
+    return await owner_stats_response("poller")
+
+@app.get("/update-dedupe-stats")
+async def update_dedupe_stats():
+    return await stats_response("update_dedupe")
+
+@app.get("/audit-log-stats")
+async def audit_log_stats():
+    """Write-behind log buffer: depth, coalesced/failed/dropped ops and last flush time."""
+    return await stats_response("audit_log")
+
+@app.get("/expiry-timer-stats")
+async def expiry_timer_stats():
+    return await owner_stats_response("expiry_timer")
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition of the counters and histograms in metrics.py.
+    With several workers: this worker's series (process="web-<pid>", whichever
+    worker took the scrape) plus the session owner's (process="owner": Telethon
+    imports and FloodWaits, sweeper kicks, expiry timer). Sum over process in queries.
+    """
+    extra = None
+    if TELETHON_REMOTE:
+        try:
+            extra = await phone_resolver.call("metrics")
+        except Exception as e:
+            logging.warning(f"Owner metrics unavailable: {e}")
+    return PlainTextResponse(REGISTRY.render(PROCESS_LABEL, extra), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def get_stats():
+    """Counts by status, expiring-in-N-days buckets and privacy_nobody share."""
+    data = await subscription_stats.get()
+    return JSONResponse(status_code=200, content={"status_code": 1, "data": jsonable_encoder(data)})
+
 @app.get("/kick_expired_users")
-def kick_expired():
-    check_and_kick_users()
-    return {"ok": True}
+async def kick_expired():
+    stats = await expiry_sweeper.run()
+    return {"ok": True, "stats": jsonable_encoder(stats)}
 
 
 
+def import_job_response(job: dict) -> JSONResponse:
+    return JSONResponse(status_code=202, content={
+        "status_code": 1,
+        "message": "Import started",
+        "job_id": job["_id"],
+        "status_url": f"/import-jobs/{job['_id']}",
+    })
+
+
 @app.post("/import-user")
-async def import_user(file: UploadFile = File(...)):
+async def import_user(file: UploadFile = File(...), background: bool = True):
     """
     Upload CSV/XLSX → map → insert/update MongoDB
+    Runs as a background job by default; background=false imports inline.
     """
     try:
         filename = file.filename.lower()
         if not (filename.endswith(".csv") or filename.endswith(".xlsx")):
             raise HTTPException(status_code=400, detail="Only CSV or XLSX allowed.")
 
-        # Read + parse file
-        file_bytes = await file.read()
-        if filename.endswith(".csv"):
-            decoded = file_bytes.decode("utf-8", errors="ignore")
-            df = pd.read_csv(io.StringIO(decoded))
-        else:
-            df = pd.read_excel(io.BytesIO(file_bytes))
-
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        if background:
+            return import_job_response(await import_jobs.create(file, "import_users"))
 
-        total_inserted, inserted, errors, not_phone = 0, [], [], 0
-
-        for idx, row in df.iterrows():
-            try:
-                mapped = transform_row_data(row)
-                phone = mapped.get("phone")
-                
-                if not phone:
-                    print("mapped", mapped)
-                    not_phone+=1
-                    errors.append({"row": idx + 1, "error": "Missing phone"})
-                    print("not_phone", not_phone)
-                    await import_users_coll.insert_one(mapped)
-                    total_inserted+=1
-                    continue
-
-                existing = await import_users_coll.find_one({"phone": phone})
-
-                if existing:
-                    continue
-
-                try:
-                    telegram_id, username = await get_telegram_id_by_phone(phone)
-                    if telegram_id:
-                        mapped["telegram_id"] = telegram_id
-                        mapped["telegram_username"] = username
-                        print(f"✅ Found Telegram ID for {phone}: {telegram_id}")
-                    else:
-                        print(f"❌ No Telegram account found for {phone}")
-                except Exception as e:
-                    print("Error fetching telegram_id:", e)
-
-                await import_users_coll.insert_one(mapped)
-                inserted.append(mapped["phone"])
-                total_inserted+=1
-        
-            except Exception as row_err:
-                email_val = row.get("Email ID") if "Email ID" in row else None
-                errors.append({"row": idx + 1, "error": str(row_err), "email": email_val})
+        # Stream + parse file in chunks
+        chunks = read_upload_chunks(file.file, filename, IMPORT_CHUNK_SIZE)
+        summary = await import_chunks(chunks, import_users_coll, "phone", phone_resolver)
 
+        if not summary["rows"]:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
 
         return JSONResponse(
             content={
                 "message": "bulk import completed",
-                "inserted": inserted,
-                "errors": errors,
+                "inserted": summary["inserted"],
+                "duplicates_skipped": summary["duplicates"],
+                "errors": summary["errors"],
             },
             status_code=200,
         )
@@ -645,91 +1066,27 @@ async def import_user(file: UploadFile = File(...)):
 
 
 @app.post("/rest-import-user")
-async def rest_import_user(file: UploadFile = File(...)):
+async def rest_import_user(file: UploadFile = File(...), background: bool = True):
     """
     Upload CSV/XLSX → extract mobile → fetch telegram_id → insert into MongoDB
+    Runs as a background job by default; background=false imports inline.
     """
     try:
         filename = file.filename.lower()
         if not (filename.endswith(".csv") or filename.endswith(".xlsx")):
             raise HTTPException(status_code=400, detail="Only CSV or XLSX allowed.")
 
-        # -------------------------
-        # Parse file
-        # -------------------------
-        file_bytes = await file.read()
-
-        if filename.endswith(".csv"):
-            decoded = file_bytes.decode("utf-8", errors="ignore")
-            df = pd.read_csv(io.StringIO(decoded))
-        else:
-            df = pd.read_excel(io.BytesIO(file_bytes))
-
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        if background:
+            return import_job_response(await import_jobs.create(file, "temp_users"))
 
         # -------------------------
-        # Counters
+        # Stream + process file in chunks
         # -------------------------
-        total_inserted = 0
-        inserted = []
-        errors = []
-        missing_mobile = 0
+        chunks = read_upload_chunks(file.file, filename, IMPORT_CHUNK_SIZE)
+        summary = await import_chunks(chunks, temp_users_coll, "mobile", phone_resolver)
 
-        # -------------------------
-        # Process each row
-        # -------------------------
-        for idx, row in df.iterrows():
-            try:
-                mapped = transform_row_data(row)
-                mobile = mapped.get("mobile")
-
-                # -----------------------------------------
-                # Case 1: No mobile number
-                # -----------------------------------------
-                if not mobile:
-                    missing_mobile += 1
-                    errors.append({"row": idx + 1, "error": "Missing mobile"})
-                    await temp_users_coll.insert_one(mapped)
-                    total_inserted += 1
-                    continue
-
-                # -----------------------------------------
-                # Check if user already exists
-                # -----------------------------------------
-                existing = await temp_users_coll.find_one({"mobile": mobile})
-                if existing:
-                    continue  # skip duplicate
-
-                # -----------------------------------------
-                # Fetch Telegram ID
-                # -----------------------------------------
-                try:
-                    telegram_id, username = await get_telegram_id_by_phone(mobile)
-
-                    if telegram_id:
-                        mapped["telegram_id"] = telegram_id
-                        mapped["telegram_username"] = username
-                        print(f"✅ Found Telegram ID for {mobile}: {telegram_id}")
-                    else:
-                        print(f"❌ No Telegram account found for {mobile}")
-
-                except Exception as e:
-                    print(f"Error fetching telegram_id for {mobile}: {e}")
-
-                # -----------------------------------------
-                # Insert in DB
-                # -----------------------------------------
-                await temp_users_coll.insert_one(mapped)
-                inserted.append(mobile)
-                total_inserted += 1
-
-            except Exception as row_err:
-                errors.append({
-                    "row": idx + 1,
-                    "error": str(row_err),
-                    "email": row.get("email")  # your CSV uses 'email', not Email ID
-                })
+        if not summary["rows"]:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
 
         # -------------------------
         # Response
@@ -737,10 +1094,11 @@ async def rest_import_user(file: UploadFile = File(...)):
         return JSONResponse(
             content={
                 "message": "Bulk import completed",
-                "total_inserted": total_inserted,
-                "inserted_mobiles": inserted,
-                "missing_mobile_rows": missing_mobile,
-                "errors": errors,
+                "total_inserted": summary["total_inserted"],
+                "inserted_mobiles": summary["inserted"],
+                "missing_mobile_rows": summary["missing"],
+                "duplicates_skipped": summary["duplicates"],
+                "errors": summary["errors"],
             },
             status_code=200,
         )
@@ -750,6 +1108,15 @@ async def rest_import_user(file: UploadFile = File(...)):
 
 
 
+@app.get("/import-jobs/{job_id}")
+async def import_job_status(job_id: str):
+    job = await import_jobs.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"status_code": 0, "message": "Not found"})
+    return JSONResponse(status_code=200, content={"status_code": 1, "data": jsonable_encoder(job)})
+
+
+
 # -------------------- Run --------------------
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,220 @@
+# -------------------------------------------------------------
+# metrics.py
+# In-process counters and histograms, rendered in Prometheus text format at /metrics.
+import bisect
+import threading
+import time
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()  # Mongo listeners call in from Motor's worker threads
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, const: str = "") -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, labels, const)} {_num(value)}" for labels, value in items]
+        return lines
+
+
+class Histogram:
+    """Fixed buckets; observe() is one bisect and three additions."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self, const: str = "") -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in items:
+            running = 0
+            for bound, n in zip(self.buckets + (None,), counts):
+                running += n
+                le = "+Inf" if bound is None else repr(float(bound))
+                bucket_labels = _labels(self.labelnames, labels, ",".join(filter(None, (const, 'le="%s"' % le))))
+                lines.append(f"{self.name}_bucket{bucket_labels} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels, const)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels, const)} {count}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `fn`, so nothing runs on the hot path."""
+
+    def __init__(self, name: str, help: str, fn):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def render(self, const: str = "") -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name}{_labels((), (), const)} {_num(self.fn())}"]
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, fn) -> Gauge:
+        return self.register(Gauge(name, help, fn))
+
+    def families(self, process: str = None) -> list:
+        """[name, lines] per metric; `process` adds a process="..." label to every sample."""
+        const = f'process="{process}"' if process else ""
+        return [[name, metric.render(const)] for name, metric in self._metrics.items()]
+
+    def render(self, process: str = None, extra: list = None) -> str:
+        """
+        Text exposition of this registry, merged with `extra` families from
+        another process (same metric names: HELP/TYPE once, samples appended).
+        """
+        merged = {}
+        for name, lines in self.families(process) + (extra or []):
+            if name in merged:
+                merged[name] += lines[2:]
+            else:
+                merged[name] = list(lines)
+        return "\n".join(line for lines in merged.values() for line in lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "FastAPI request latency by route", ("method", "route", "status"))
+BOT_API_SECONDS = REGISTRY.histogram(
+    "bot_api_call_duration_seconds", "Telegram Bot API call latency by method", ("method",))
+BOT_API_ERRORS = REGISTRY.counter(
+    "bot_api_errors_total", "Failed Bot API calls by method and error (HTTP/Telegram code or exception)",
+    ("method", "error"))
+TELETHON_IMPORT_SECONDS = REGISTRY.histogram(
+    "telethon_import_contacts_duration_seconds", "ImportContactsRequest latency by session and outcome",
+    ("session", "outcome"))
+TELETHON_FLOOD_WAITS = REGISTRY.counter(
+    "telethon_flood_waits_total", "FloodWait errors from Telethon by session", ("session",))
+TELETHON_FLOOD_WAIT_SECONDS = REGISTRY.counter(
+    "telethon_flood_wait_seconds_total", "FloodWait seconds imposed by Telegram, by session", ("session",))
+JOIN_MONGO_SECONDS = REGISTRY.histogram(
+    "join_mongo_duration_seconds", "Mongo time spent per processed join request, by phase", ("phase",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+UPDATES_DROPPED = REGISTRY.counter(
+    "webhook_duplicate_updates_total", "Redelivered updates dropped by update_id, by where they were caught",
+    ("source",))
+MONGO_COMMAND_SECONDS = REGISTRY.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by command", ("command",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+MONGO_COMMAND_FAILURES = REGISTRY.counter(
+    "mongo_command_failures_total", "Failed MongoDB commands by command", ("command",))
+AUDIT_FLUSH_SECONDS = REGISTRY.histogram(
+    "audit_log_flush_duration_seconds", "Time to flush the buffered log_collection writes")
+AUDIT_WRITES_FAILED = REGISTRY.counter(
+    "audit_log_write_failures_total", "Buffered log_collection writes rejected by MongoDB")
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Feeds MONGO_COMMAND_SECONDS from pymongo's command events (durations come with the event)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(event.command_name)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task/stream overhead). The route
+    label is the matched path template, so path parameters don't explode cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path, status)
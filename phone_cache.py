@@ -0,0 +1,94 @@
+# -------------------------------------------------------------
+# phone_cache.py
+# Two-level cache for phone -> Telegram ID lookups (in-process LRU + Mongo).
+import collections
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+POSITIVE_TTL = 7 * 86400
+NEGATIVE_TTL = 86400  # privacy_nobody / no account: re-check daily
+
+
+class PhoneCache:
+    """
+    LRU in front of a Mongo collection of {_id: phone, telegram_id, username, expires_at}.
+    Misses (telegram_id None) are cached too, with the shorter negative TTL.
+    """
+
+    def __init__(self, collection, max_entries: int = 50000,
+                 ttl: int = POSITIVE_TTL, negative_ttl: int = NEGATIVE_TTL):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lru = collections.OrderedDict()  # phone -> ((telegram_id, username), expires_ts)
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    async def ensure_indexes(self):
+        # Mongo drops documents once expires_at has passed
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get_many(self, phones) -> dict:
+        """Return {phone: (telegram_id, username)} for every phone with a live entry."""
+        now = time.time()
+        found, missing = {}, []
+        for phone in phones:
+            entry = self._lru.get(phone)
+            if entry and entry[1] > now:
+                self._lru.move_to_end(phone)
+                found[phone] = entry[0]
+                self.memory_hits += 1
+            else:
+                missing.append(phone)
+
+        if missing:
+            cursor = self.collection.find(
+                {"_id": {"$in": missing}, "expires_at": {"$gt": datetime.utcnow()}},
+                {"telegram_id": 1, "username": 1, "expires_at": 1},
+            )
+            hits = 0
+            async for doc in cursor:
+                value = (doc.get("telegram_id"), doc.get("username"))
+                found[doc["_id"]] = value
+                # expires_at comes back naive UTC
+                self._remember(doc["_id"], value, doc["expires_at"].replace(tzinfo=timezone.utc).timestamp())
+                hits += 1
+            self.mongo_hits += hits
+            self.misses += len(missing) - hits
+
+        return found
+
+    async def set_many(self, results: dict):
+        """Store fresh lookups; positive and negative results get different TTLs."""
+        if not results:
+            return
+        now = datetime.utcnow()
+        ops = []
+        for phone, (telegram_id, username) in results.items():
+            ttl = self.ttl if telegram_id else self.negative_ttl
+            expires_at = now + timedelta(seconds=ttl)
+            self._remember(phone, (telegram_id, username), time.time() + ttl)
+            ops.append(UpdateOne(
+                {"_id": phone},
+                {"$set": {"telegram_id": telegram_id, "username": username, "expires_at": expires_at}},
+                upsert=True,
+            ))
+        await self.collection.bulk_write(ops, ordered=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._lru),
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+        }
+
+    def _remember(self, phone, value, expires_ts: float):
+        self._lru[phone] = (value, expires_ts)
+        self._lru.move_to_end(phone)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
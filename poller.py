@@ -0,0 +1,99 @@
+# -------------------------------------------------------------
+# poller.py
+# getUpdates long-polling: ingestion without a public webhook, and fast backlog drain.
+import asyncio
+import logging
+import time
+
+OFFSET_ID = "getUpdates"
+MAX_BATCH = 100  # Telegram's cap for getUpdates
+
+
+class UpdatePoller:
+    """
+    Pulls up to `limit` updates per getUpdates call and hands each one to
+    `handle_update` (the same path /webhook uses). The offset, which is also
+    Telegram's acknowledgement, advances only past updates that were taken.
+    It is saved to Mongo after every batch so a restart resumes where it stopped.
+    """
+
+    def __init__(self, bot_api, handle_update, offsets_collection, limit: int = MAX_BATCH,
+                 timeout: int = 30, allowed_updates: list = None, retry_delay: float = 1.0):
+        self.bot_api = bot_api
+        self.handle_update = handle_update  # async (update) -> bool; False = not taken, retry later
+        self.offsets = offsets_collection
+        self.limit = min(limit, MAX_BATCH)
+        self.timeout = timeout  # long-poll seconds Telegram holds the request open
+        self.allowed_updates = allowed_updates or ["chat_join_request"]
+        self.retry_delay = retry_delay
+        self.offset = None
+        self._task = None
+        self.batches = 0
+        self.updates = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.last_poll_at = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        doc = await self.offsets.find_one({"_id": OFFSET_ID})
+        self.offset = doc["offset"] if doc else None
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Polling getUpdates (offset={self.offset}, limit={self.limit}, timeout={self.timeout}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "offset": self.offset,
+            "batches": self.batches,
+            "updates": self.updates,
+            "errors": self.errors,
+            "last_batch_size": self.last_batch_size,
+            "last_poll_at": self.last_poll_at,
+        }
+
+    async def poll_once(self) -> int:
+        """One getUpdates round; returns how many updates were taken."""
+        params = {"limit": self.limit, "timeout": self.timeout, "allowed_updates": self.allowed_updates}
+        if self.offset is not None:
+            params["offset"] = self.offset
+        # The HTTP timeout has to outlast the long poll
+        response = await self.bot_api.call("getUpdates", params, timeout=self.timeout + 10)
+        self.last_poll_at = time.time()
+        if not response.get("ok"):
+            raise RuntimeError(f"getUpdates failed: {response.get('description')}")
+
+        batch = response.get("result", [])
+        self.last_batch_size = len(batch)
+        taken = 0
+        for update in batch:
+            if not await self.handle_update(update):
+                break  # backlog full: fetch this update again on the next round
+            self.offset = update["update_id"] + 1
+            taken += 1
+
+        if batch:
+            self.batches += 1
+        if taken:
+            self.updates += taken
+            await self.offsets.update_one({"_id": OFFSET_ID}, {"$set": {"offset": self.offset}}, upsert=True)
+        return taken
+
+    async def _run(self):
+        while True:
+            try:
+                taken = await self.poll_once()
+                if taken < self.last_batch_size:
+                    await asyncio.sleep(self.retry_delay)  # join queue full; let it drain
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"getUpdates poll error: {e}")
+                await asyncio.sleep(self.retry_delay)
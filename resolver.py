@@ -0,0 +1,171 @@
+# -------------------------------------------------------------
+# resolver.py
+# Phone -> Telegram ID resolution through the Telethon user session(s).
+import asyncio
+import logging
+import time
+
+from telethon.errors import PhoneNumberInvalidError, FloodWaitError
+from telethon.tl.functions.contacts import ImportContactsRequest, DeleteContactsRequest
+from telethon.tl.types import InputPhoneContact
+
+from metrics import TELETHON_IMPORT_SECONDS, TELETHON_FLOOD_WAITS, TELETHON_FLOOD_WAIT_SECONDS
+
+# Telegram accepts many contacts per ImportContactsRequest; 100 keeps flood waits rare.
+RESOLVE_BATCH_SIZE = 100
+
+
+class PhoneResolver:
+    """
+    Resolves phones in batches: one ImportContactsRequest for N phones, the
+    returned client_ids mapped back to phones, and one DeleteContactsRequest
+    to clean up every imported contact. Batches are spread over a SessionPool;
+    a FloodWait parks only the session that got it and the batch moves on.
+    """
+
+    def __init__(self, pool, batch_size: int = RESOLVE_BATCH_SIZE, cache=None):
+        self.pool = pool  # SessionPool of logged-in user sessions
+        self.batch_size = batch_size
+        self.cache = cache  # optional PhoneCache consulted before any MTProto call
+
+    @property
+    def flood_wait_until(self) -> float:
+        """Epoch seconds until some session can import again (0 if one can now)."""
+        return self.pool.flood_wait_until
+
+    @property
+    def flood_wait_remaining(self) -> float:
+        return max(0.0, self.flood_wait_until - time.time())
+
+    async def status(self) -> dict:
+        """FloodWait state, per-session and cache stats (also served to API workers by resolver_ipc)."""
+        return {
+            "flood_wait_seconds": round(self.flood_wait_remaining, 1),
+            "sessions": self.pool.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    async def resolve(self, phone: str):
+        """Single-phone convenience wrapper; returns (telegram_id, username)."""
+        return (await self.resolve_many([phone])).get(phone, (None, None))
+
+    async def resolve_many(self, phones) -> dict:
+        """Return {phone: (telegram_id, username)}; unresolved phones map to (None, None)."""
+        phones = list(dict.fromkeys(p for p in phones if p))
+        results = {}
+        if self.cache is not None and phones:
+            try:
+                results.update(await self.cache.get_many(phones))
+            except Exception as e:
+                logging.warning(f"Phone cache read failed: {e}")
+            phones = [p for p in phones if p not in results]
+
+        async def one_batch(batch):
+            fresh = await self._resolve_batch(batch)
+            if self.cache is not None:
+                try:
+                    await self.cache.set_many(fresh)
+                except Exception as e:
+                    logging.warning(f"Phone cache write failed: {e}")
+            return fresh
+
+        # All batches are queued at once; the pool runs as many as it has free sessions
+        batches = [phones[i:i + self.batch_size] for i in range(0, len(phones), self.batch_size)]
+        for fresh in await asyncio.gather(*(one_batch(batch) for batch in batches)):
+            results.update(fresh)
+
+        # Phones that errored out are not cached, but callers still get an answer
+        for phone in phones:
+            results.setdefault(phone, (None, None))
+        return results
+
+    async def _import_contacts(self, session, contacts: list):
+        """ImportContactsRequest, timed by outcome."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await session.client(ImportContactsRequest(contacts))
+            outcome = "ok"
+            return result
+        except FloodWaitError:
+            outcome = "flood_wait"
+            raise
+        finally:
+            TELETHON_IMPORT_SECONDS.observe(time.perf_counter() - start, session.name, outcome)
+
+    async def _import_batch(self, by_client_id: dict):
+        """Import one batch on the session free soonest and delete the contacts again on that same session."""
+        contacts = [
+            InputPhoneContact(client_id=cid, phone=phone, first_name="Temp", last_name="Temp")
+            for cid, phone in by_client_id.items()
+        ]
+        session = await self.pool.acquire()
+        try:
+            result = await self._import_contacts(session, contacts)
+            session.batches += 1
+            session.phones += len(contacts)
+            if result.users:
+                try:
+                    await session.client(DeleteContactsRequest(id=list(result.users)))
+                except Exception as e:
+                    logging.warning(f"Contact cleanup failed for {len(result.users)} users: {e}")
+            return result
+        except FloodWaitError as e:
+            wait_time = e.seconds + 2
+            TELETHON_FLOOD_WAITS.inc(session.name)
+            TELETHON_FLOOD_WAIT_SECONDS.inc(session.name, amount=wait_time)
+            self.pool.flooded(session, wait_time)
+            raise
+        except PhoneNumberInvalidError:
+            raise
+        except Exception as e:
+            session.errors += 1
+            session.last_error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            await self.pool.release(session)
+
+    async def _resolve_batch(self, phones: list) -> dict:
+        """
+        Definitive answers only: phones that hit an unexpected error are left out,
+        so they are neither cached nor reported as "no account".
+        """
+        results = {}
+        pending = phones
+        retried = False
+
+        while pending:
+            by_client_id = {i + 1: phone for i, phone in enumerate(pending)}
+            try:
+                result = await self._import_batch(by_client_id)
+            except FloodWaitError:
+                continue  # that session is parked; the next acquire picks the one free soonest
+            except PhoneNumberInvalidError:
+                if len(pending) == 1:
+                    logging.warning(f"Invalid phone number: {pending[0]}")
+                    results[pending[0]] = (None, None)
+                    break
+                # One bad number rejects the batch; fall back to resolving each phone alone.
+                for phone in pending:
+                    results.update(await self._resolve_batch([phone]))
+                break
+            except Exception as e:
+                logging.error(f"Unexpected error fetching {len(pending)} phones: {e}")
+                break
+
+            users = {user.id: user for user in result.users}
+            retry_ids = set(result.retry_contacts)
+            for cid, phone in by_client_id.items():
+                if cid not in retry_ids:
+                    results[phone] = (None, None)
+            for imported in result.imported:
+                user = users.get(imported.user_id)
+                phone = by_client_id.get(imported.client_id)
+                if user and phone:
+                    results[phone] = (user.id, getattr(user, "username", None))
+
+            # Contacts Telegram asked us to retry get one more pass, then count as unresolved.
+            pending = [] if retried else [by_client_id[cid] for cid in result.retry_contacts if cid in by_client_id]
+            retried = True
+
+        return results
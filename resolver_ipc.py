@@ -0,0 +1,170 @@
+# -------------------------------------------------------------
+# resolver_ipc.py
+# Unix-socket RPC between uvicorn workers and the one process that owns the Telethon session.
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+
+RESOLVER_SOCKET = "/tmp/telegram_resolver.sock"
+STREAM_LIMIT = 16 * 1024 * 1024  # one line per message; a 5000-phone import chunk is ~200 KB
+
+
+class ResolverServer:
+    """
+    Newline-delimited JSON over a Unix socket: {"id", "op", "params"} in,
+    {"id", "result"} or {"id", "error"} out. Each request runs as its own task,
+    so a long FloodWait on one import doesn't hold up a webhook lookup.
+    `handlers` maps extra op names to async callables taking the params as kwargs.
+    """
+
+    def __init__(self, resolver, path: str = RESOLVER_SOCKET, handlers: dict = None):
+        self.resolver = resolver
+        self.path = path
+        self.handlers = {
+            "resolve_many": self._resolve_many,
+            "status": self._status,
+            **(handlers or {}),
+        }
+        self._server = None
+        self._writers = set()
+        self.requests = 0
+        self.errors = 0
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # stale socket from a previous run
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path, limit=STREAM_LIMIT)
+        logging.info(f"Resolver listening on {self.path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()  # server.close() leaves accepted connections open
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _resolve_many(self, phones: list) -> dict:
+        resolved = await self.resolver.resolve_many(phones)
+        return {phone: list(value) for phone, value in resolved.items()}
+
+    async def _status(self) -> dict:
+        return await self.resolver.status()
+
+    async def _serve(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self._writers.add(writer)
+
+        async def handle(message):
+            self.requests += 1
+            try:
+                handler = self.handlers[message["op"]]
+                reply = {"id": message["id"], "result": await handler(**message.get("params", {}))}
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Resolver op {message.get('op')} failed: {e}")
+                reply = {"id": message.get("id"), "error": f"{type(e).__name__}: {e}"}
+            reply["flood_wait_until"] = self.resolver.flood_wait_until
+            async with write_lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(handle(json.loads(line)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+
+class RemoteResolver:
+    """
+    Drop-in for PhoneResolver in API workers: same resolve/resolve_many/status
+    calls, answered by the session owner over one persistent, multiplexed
+    connection. Reconnects on the next call after the owner restarts.
+    """
+
+    def __init__(self, path: str = RESOLVER_SOCKET, timeout: float = None):
+        self.path = path
+        self.timeout = timeout
+        self.flood_wait_until = 0.0  # as of the last reply
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def flood_wait_remaining(self) -> float:
+        return max(0.0, self.flood_wait_until - time.time())
+
+    async def resolve(self, phone: str):
+        return (await self.resolve_many([phone]))[phone]
+
+    async def resolve_many(self, phones: list) -> dict:
+        if not phones:
+            return {}
+        result = await self.call("resolve_many", phones=list(phones))
+        return {phone: tuple(value) for phone, value in result.items()}
+
+    async def status(self) -> dict:
+        return await self.call("status")
+
+    async def call(self, op: str, **params):
+        await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(json.dumps({"id": request_id, "op": op, "params": params}).encode() + b"\n")
+            await self._writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        self._reader = self._writer = self._reader_task = None
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path, limit=STREAM_LIMIT)
+            self._reader_task = asyncio.create_task(self._read_replies(self._reader, self._writer))
+
+    async def _read_replies(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                reply = json.loads(line)
+                self.flood_wait_until = reply.get("flood_wait_until", self.flood_wait_until)
+                future = self._pending.get(reply["id"])
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(RuntimeError(reply["error"]))
+                else:
+                    future.set_result(reply["result"])
+        finally:
+            # Owner went away: fail whatever is in flight; the next call reconnects
+            writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Resolver process disconnected"))
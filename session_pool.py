@@ -0,0 +1,97 @@
+# -------------------------------------------------------------
+# session_pool.py
+# Several Telethon user sessions behind one resolver, each with its own FloodWait deadline.
+import asyncio
+import logging
+import time
+
+
+class TelethonSession:
+    """One logged-in client plus its flood deadline and usage counters."""
+
+    def __init__(self, name: str, client):
+        self.name = name
+        self.client = client
+        self.flood_until = 0.0  # epoch seconds; Telegram refuses contact imports until then
+        self.inflight = 0
+        self.batches = 0
+        self.phones = 0
+        self.flood_waits = 0
+        self.flood_seconds = 0.0
+        self.errors = 0
+        self.last_error = None
+
+    @property
+    def flood_remaining(self) -> float:
+        return max(0.0, self.flood_until - time.time())
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "connected": self.client.is_connected(),
+            "inflight": self.inflight,
+            "flood_wait_seconds": round(self.flood_remaining, 1),
+            "batches": self.batches,
+            "phones": self.phones,
+            "flood_waits": self.flood_waits,
+            "flood_wait_seconds_total": round(self.flood_seconds, 1),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+class SessionPool:
+    """
+    Hands out the session that is free soonest: the least-loaded one among
+    those not in FloodWait, or, when every session is flooded, the one whose
+    deadline passes first (the caller waits for it, nobody sleeps holding a
+    session). `max_inflight` batches may run on one session at a time.
+    """
+
+    def __init__(self, sessions: list, max_inflight: int = 1):
+        if not sessions:
+            raise ValueError("SessionPool needs at least one session")
+        self.sessions = sessions
+        self.max_inflight = max_inflight
+        self._changed = asyncio.Condition()
+
+    def add(self, session: TelethonSession):
+        self.sessions.append(session)
+
+    @property
+    def flood_wait_until(self) -> float:
+        """When the first session comes out of FloodWait (0 if one is usable now)."""
+        now = time.time()
+        deadlines = [s.flood_until for s in self.sessions]
+        return 0.0 if any(d <= now for d in deadlines) else min(deadlines)
+
+    async def acquire(self) -> TelethonSession:
+        async with self._changed:
+            while True:
+                now = time.time()
+                open_slots = [s for s in self.sessions if s.inflight < self.max_inflight]
+                ready = [s for s in open_slots if s.flood_until <= now]
+                if ready:
+                    session = min(ready, key=lambda s: s.inflight)
+                    session.inflight += 1
+                    return session
+                # Wait for a release, a new flood deadline, or the soonest deadline to pass
+                timeout = min((s.flood_until for s in open_slots), default=now) - now
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout if open_slots else None)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, session: TelethonSession):
+        async with self._changed:
+            session.inflight -= 1
+            self._changed.notify_all()
+
+    def flooded(self, session: TelethonSession, seconds: float):
+        session.flood_until = time.time() + seconds
+        session.flood_waits += 1
+        session.flood_seconds += seconds
+        logging.warning(f"FloodWait on session {session.name}: {seconds}s, routing to other sessions")
+
+    def stats(self) -> list:
+        return [session.stats() for session in self.sessions]
@@ -0,0 +1,40 @@
+#!/usr/bin/env bash
+# One Telethon session owner (telethon_service.py) + WEB_WORKERS uvicorn workers.
+# Workers reach the owner over RESOLVER_SOCKET and connect lazily, so they can
+# start while the owner is still logging in.
+#
+# Stats are per process: /metrics and the dispatcher, invite-pool, join-worker,
+# audit-log and update-dedupe stats describe the worker that took the request
+# (process="web-<pid>") plus the owner's copy (process="owner"), fetched over
+# the socket. /expiry-timer-stats and /poller-stats report the owner only.
+set -euo pipefail
+
+WEB_WORKERS="${WEB_WORKERS:-4}"
+export RESOLVER_SOCKET="${RESOLVER_SOCKET:-/tmp/telegram_resolver.sock}"
+
+# Every process runs its own Bot API rate limiter: split Telegram's ~30 msg/s
+# between the owner and the workers unless BOT_GLOBAL_RATE is set explicitly.
+BOT_TOTAL_RATE="${BOT_TOTAL_RATE:-30}"
+export BOT_GLOBAL_RATE="${BOT_GLOBAL_RATE:-$(awk -v t="$BOT_TOTAL_RATE" -v n="$WEB_WORKERS" 'BEGIN { printf "%.2f", t / (n + 1) }')}"
+
+# One log file per process: RotatingFileHandler can't share a file across processes
+LOG_DIR="${LOG_DIR:-logs}"
+mkdir -p "$LOG_DIR"
+
+LOG_FILE="$LOG_DIR/telethon_service.log" python telethon_service.py &
+SERVICE_PID=$!
+
+# {pid} is filled in by log_config.setup_logging inside each worker
+LOG_FILE="$LOG_DIR/web-{pid}.log" TELETHON_MODE=remote \
+    uvicorn main:app --host 0.0.0.0 --port 3040 --workers "$WEB_WORKERS" &
+WEB_PID=$!
+
+trap 'kill -TERM "$WEB_PID" "$SERVICE_PID" 2>/dev/null || true' TERM INT
+
+# If either side exits, take the other down too so the container restarts as a unit
+set +e
+wait -n "$SERVICE_PID" "$WEB_PID"
+STATUS=$?
+kill -TERM "$WEB_PID" "$SERVICE_PID" 2>/dev/null
+wait
+exit "$STATUS"
@@ -0,0 +1,148 @@
+# -------------------------------------------------------------
+# stats.py
+# Incrementally maintained subscription counters with periodic $facet reconcile.
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+COUNTERS_ID = "subscriptions"
+COUNTER_FIELDS = ("total", "joined", "pending", "left_group", "privacy_nobody")
+EXPIRY_BUCKET_DAYS = (1, 3, 7, 30)
+
+
+def doc_counts(doc: dict, sign: int = 1) -> dict:
+    """Counter contribution of one subscription document (sign=-1 to remove it)."""
+    joined = bool(doc.get("joined"))
+    return {
+        "total": sign,
+        "joined": sign if joined else 0,
+        "pending": 0 if joined else sign,
+        "left_group": sign if doc.get("left_group") else 0,
+        "privacy_nobody": sign if doc.get("privacy_nobody") else 0,
+    }
+
+
+def diff_counts(before: dict, after: dict) -> dict:
+    """Counter change when a document goes from `before` to `after`."""
+    old, new = doc_counts(before), doc_counts(after)
+    return {name: new[name] - old[name] for name in COUNTER_FIELDS}
+
+
+class SubscriptionStats:
+    """
+    One counters document, $inc'd by every code path that changes a subscription's
+    status, so reading stats is a single _id lookup. Expiry buckets depend on the
+    clock and are refreshed by reconcile(), which also overwrites any drift.
+    """
+
+    def __init__(self, users_collection, counters_collection, reconcile_interval: int = 900):
+        self.users = users_collection
+        self.counters = counters_collection
+        self.reconcile_interval = reconcile_interval
+        self._task = None
+        self.last_drift = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def apply(self, deltas: dict):
+        """$inc the non-zero deltas; counter updates never fail the caller's request."""
+        deltas = {name: value for name, value in deltas.items() if value}
+        if not deltas:
+            return
+        try:
+            await self.counters.update_one({"_id": COUNTERS_ID}, {"$inc": deltas}, upsert=True)
+        except Exception as e:
+            logging.warning(f"Counter update failed ({deltas}): {e}")
+
+    async def added(self, doc: dict):
+        await self.apply(doc_counts(doc, 1))
+
+    async def added_many(self, docs: list):
+        await self.apply(self._totals(docs, 1))
+
+    async def removed(self, docs: list):
+        await self.apply(self._totals(docs, -1))
+
+    @staticmethod
+    def _totals(docs: list, sign: int) -> dict:
+        totals = dict.fromkeys(COUNTER_FIELDS, 0)
+        for doc in docs:
+            for name, value in doc_counts(doc, sign).items():
+                totals[name] += value
+        return totals
+
+    async def changed(self, before: dict, after: dict):
+        await self.apply(diff_counts(before, after))
+
+    async def get(self) -> dict:
+        doc = await self.counters.find_one({"_id": COUNTERS_ID}) or {}
+        counts = {name: doc.get(name, 0) for name in COUNTER_FIELDS}
+        total = counts["total"]
+        return {
+            **counts,
+            "privacy_nobody_share": round(counts["privacy_nobody"] / total, 4) if total else 0.0,
+            "expiring_in_days": doc.get("expiring_in_days", {}),
+            "reconciled_at": doc.get("reconciled_at"),
+        }
+
+    async def reconcile(self) -> dict:
+        """Recount everything with one $facet pass and overwrite the counters."""
+        # Whole seconds: Mongo keeps milliseconds, and bucket ids must match these keys
+        now = datetime.now().replace(microsecond=0)
+        boundaries = [now] + [now + timedelta(days=days) for days in EXPIRY_BUCKET_DAYS]
+
+        def flag(field):
+            return {"$sum": {"$cond": [{"$eq": [f"${field}", True]}, 1, 0]}}
+
+        pipeline = [{"$facet": {
+            "status": [{"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "joined": flag("joined"),
+                "left_group": flag("left_group"),
+                "privacy_nobody": flag("privacy_nobody"),
+            }}],
+            "expiring": [
+                {"$match": {"expiry_date": {"$gte": boundaries[0], "$lt": boundaries[-1]}}},
+                {"$bucket": {"groupBy": "$expiry_date", "boundaries": boundaries, "output": {"count": {"$sum": 1}}}},
+            ],
+        }}]
+        result = (await self.users.aggregate(pipeline).to_list(1))[0]
+
+        status = result["status"][0] if result["status"] else {}
+        counts = {name: status.get(name, 0) for name in ("total", "joined", "left_group", "privacy_nobody")}
+        counts["pending"] = counts["total"] - counts["joined"]
+
+        # Buckets are cumulative: "7" means expiring within the next 7 days
+        by_start = {bucket["_id"]: bucket["count"] for bucket in result["expiring"]}
+        expiring, running = {}, 0
+        for start, days in zip(boundaries[:-1], EXPIRY_BUCKET_DAYS):
+            running += by_start.get(start, 0)
+            expiring[str(days)] = running
+
+        before = await self.counters.find_one({"_id": COUNTERS_ID}) or {}
+        self.last_drift = {name: before.get(name, 0) - counts[name] for name in COUNTER_FIELDS}
+        await self.counters.update_one(
+            {"_id": COUNTERS_ID},
+            {"$set": {**counts, "expiring_in_days": expiring, "reconciled_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        if any(self.last_drift.values()):
+            logging.info(f"Subscription counters reconciled, drift: {self.last_drift}")
+        return counts
+
+    async def _reconcile_loop(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logging.error(f"Counter reconcile failed: {e}")
+            await asyncio.sleep(self.reconcile_interval)
@@ -0,0 +1,125 @@
+# -------------------------------------------------------------
+# sweeper.py
+# Async expiry sweep: kick expired users and delete their subscriptions.
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from pymongo import DeleteOne
+
+# Fields the stats counters need to know about a removed subscription
+PROJECTION = {"telegram_id": 1, "joined": 1, "left_group": 1, "privacy_nobody": 1}
+
+
+class ExpirySweeper:
+    """
+    Streams expired subscriptions off the expiry_date index, deletes them in
+    bulk_write batches (re-checking expiry_date, so a plan extended mid-sweep
+    survives), then kicks the deleted ones with bounded concurrency (kicks go
+    through the rate-limited dispatcher).
+    """
+
+    def __init__(self, users_collection, kick, concurrency: int = 10, delete_batch: int = 500,
+                 on_removed=None):
+        self.users = users_collection
+        self.kick = kick  # async (telegram_id) -> bool, True once the ban went through
+        self.on_removed = on_removed  # async (docs) -> None, e.g. SubscriptionStats.removed
+        self.concurrency = concurrency
+        self.delete_batch = delete_batch
+        self.last_run = None
+        self._lock = asyncio.Lock()
+
+    async def run(self) -> dict:
+        """One sweep; overlapping calls wait for the running one instead of double-kicking."""
+        async with self._lock:
+            return await self._sweep()
+
+    async def expire_one(self, doc_id) -> bool:
+        """
+        Expire a single subscription if it is still past its expiry_date.
+        The date check and delete are one atomic call, so an extension that
+        lands first wins and nothing happens.
+        """
+        user = await self.users.find_one_and_delete(
+            {"_id": doc_id, "expiry_date": {"$lt": datetime.now()}},
+            projection=PROJECTION,
+        )
+        if not user:
+            return False
+        if self.on_removed:
+            await self.on_removed([user])
+        if user.get("telegram_id"):
+            await self.kick(user["telegram_id"])
+        logging.info(f"[Auto Kick] {doc_id} expired (telegram_id={user.get('telegram_id')})")
+        return True
+
+    async def _sweep(self) -> dict:
+        logging.info("Running expiry sweep")
+        started = time.perf_counter()
+        now = datetime.now()
+        stats = {"expired": 0, "kicked": 0, "deleted": 0, "started_at": datetime.utcnow()}
+        kick_time = 0.0
+        sem = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        batch = []
+
+        async def kick_one(telegram_id):
+            nonlocal kick_time
+            t = time.perf_counter()
+            try:
+                if await self.kick(telegram_id):
+                    stats["kicked"] += 1
+            finally:
+                kick_time += time.perf_counter() - t
+                sem.release()
+
+        async def flush():
+            if not batch:
+                return
+            # Delete first, re-checking the date: an /extend-plan that landed after the
+            # cursor read keeps its subscription and its member is not kicked
+            result = await self.users.bulk_write(
+                [DeleteOne({"_id": user["_id"], "expiry_date": {"$lt": now}}) for user in batch],
+                ordered=False,
+            )
+            stats["deleted"] += result.deleted_count
+            gone = batch
+            if result.deleted_count != len(batch):
+                kept = {doc["_id"] async for doc in self.users.find({"_id": {"$in": [u["_id"] for u in batch]}},
+                                                                    {"_id": 1})}
+                gone = [user for user in batch if user["_id"] not in kept]
+            if self.on_removed:
+                if result.deleted_count == len(batch):
+                    await self.on_removed(batch)
+                else:
+                    # Some went to an extension or to the expiry timer's own delete (which
+                    # already counted them); which is which is unknown, so leave the
+                    # counters to the next reconcile rather than subtract twice
+                    logging.warning(f"Sweep deleted {result.deleted_count} of {len(batch)}; "
+                                    f"counters left to reconcile")
+            for user in gone:
+                # Delete by _id above: several unjoined subscriptions share telegram_id None
+                if user.get("telegram_id"):
+                    await sem.acquire()  # backpressure: don't read ahead of the kicks
+                    task = asyncio.create_task(kick_one(user["telegram_id"]))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            batch.clear()
+
+        cursor = self.users.find({"expiry_date": {"$lt": now}}, PROJECTION)
+        async for user in cursor:
+            stats["expired"] += 1
+            batch.append(user)
+            if len(batch) >= self.delete_batch:
+                await flush()
+
+        await flush()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        stats["duration_seconds"] = round(time.perf_counter() - started, 3)
+        stats["kick_seconds_total"] = round(kick_time, 3)
+        self.last_run = stats
+        logging.info(f"[Auto Kick] sweep: {stats}")
+        return stats
@@ -0,0 +1,57 @@
+# -------------------------------------------------------------
+# telethon_service.py
+# The one process that owns the Telethon session when the API runs as several
+# uvicorn workers (see start.sh). It serves phone lookups and background import
+# jobs to the workers over a Unix socket, handles ChatAction events, and runs the
+# once-per-deployment jobs (expiry sweep/timer, counters, webhook registration or
+# getUpdates polling).
+#
+#   python telethon_service.py
+import os
+
+os.environ["TELETHON_MODE"] = "local"  # this process is the owner, whatever the shared env says
+
+import asyncio
+import logging
+import signal
+
+import main
+from log_config import setup_logging
+from resolver_ipc import ResolverServer
+
+
+async def run():
+    setup_logging()
+    await main.start_core()
+    await main.start_owner()
+
+    server = ResolverServer(
+        main.phone_resolver,
+        main.RESOLVER_SOCKET_PATH,
+        handlers={
+            "run_import_job": main.import_jobs.run,
+            # The owner serves no HTTP: workers fold these into /metrics and the *-stats endpoints
+            "stats": main.owner_stats,
+            "metrics": main.owner_metrics,
+        },
+    )
+    await server.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logging.info("Telethon service stopping")
+    await main.poller.stop()
+    await server.stop()
+    await main.join_workers.stop()  # started on demand by polled join requests
+    await asyncio.gather(*main.join_followups, return_exceptions=True)
+    await main.stop_owner()
+    await main.stop_core()
+    main.stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+# -------------------------------------------------------------
+# tests/test_query_plans.py
+# Every hot query must be served by an index: fails on a COLLSCAN in the winning plan.
+#
+#   MONGO_URI=mongodb://localhost:27017 DB=... USER_COLLECTION=... python -m pytest tests
+#
+# Skipped when MONGO_URI is unset. Runs ensure_indexes() on the configured
+# collections first, as start_owner does.
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("dotenv").load_dotenv()
+
+if not os.getenv("MONGO_URI"):
+    pytest.skip("MONGO_URI not set", allow_module_level=True)
+
+motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+from check_query_plans import collections_from_env, query_stages
+from indexes import ensure_indexes, hot_queries
+
+
+def run(fn):
+    """Run fn(db) on a fresh loop with its own client (Motor clients are bound to a loop)."""
+    async def main():
+        client = motor_asyncio.AsyncIOMotorClient(os.getenv("MONGO_URI"))
+        try:
+            return await fn(client[os.getenv("DB")])
+        finally:
+            client.close()
+    return asyncio.run(main())
+
+
+@pytest.fixture(scope="module", autouse=True)
+def indexes():
+    run(lambda db: ensure_indexes(collections_from_env(db)))
+
+
+@pytest.mark.parametrize("name,query", hot_queries(), ids=lambda value: str(value))
+def test_hot_query_uses_an_index(name, query):
+    stages = run(lambda db: query_stages(collections_from_env(db)[name], query))
+    assert "COLLSCAN" not in stages, f"{name} {query}: {' > '.join(stages)}"
+
+
+def test_ensure_indexes_keeps_existing_index_under_another_name():
+    """A hand-made telegram_id_1 must not stop startup (IndexOptionsConflict, code 85)."""
+    async def check(db):
+        coll = db[f"test_indexes_{uuid.uuid4().hex}"]
+        try:
+            await coll.create_index("telegram_id")  # default name telegram_id_1
+            report = await ensure_indexes({"users": coll})
+            stages = await query_stages(coll, {"telegram_id": 1})
+        finally:
+            await coll.drop()
+        return report, stages
+
+    report, stages = run(check)
+    assert ("users", "telegram_id", "existing") in report
+    assert "COLLSCAN" not in stages
@@ -0,0 +1,74 @@
+# -------------------------------------------------------------
+# update_dedupe.py
+# Drop Telegram updates that were already accepted (redelivery after a slow or failed webhook).
+import collections
+import logging
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from metrics import UPDATES_DROPPED
+
+DEDUPE_TTL = 86400  # Telegram gives up redelivering long before this
+
+
+class UpdateDeduper:
+    """
+    Ring buffer of recent update_ids (deque + set, O(1) lookups) in front of a
+    Mongo collection of {_id: update_id, seen_at} with a TTL index. The insert is
+    the claim: a duplicate key means another worker or an earlier run took it.
+    If Mongo is unavailable the update is let through rather than lost.
+    """
+
+    def __init__(self, collection, capacity: int = 10000, ttl: int = DEDUPE_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._recent = collections.deque(maxlen=capacity)
+        self._seen = set()
+        self.accepted = 0
+        self.dropped = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("seen_at", expireAfterSeconds=self.ttl)
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        """Record update_id; True if it was already seen (and should be dropped)."""
+        if update_id in self._seen:
+            self._drop("memory")
+            return True
+        self._remember(update_id)
+        try:
+            await self.collection.insert_one({"_id": update_id, "seen_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            self._drop("mongo")
+            return True
+        except Exception as e:
+            logging.warning(f"Update dedupe write failed for {update_id}: {e}")
+        self.accepted += 1
+        return False
+
+    async def forget(self, update_id: int):
+        """Undo is_duplicate() for an update we could not take, so its redelivery is processed."""
+        self._seen.discard(update_id)
+        try:
+            await self.collection.delete_one({"_id": update_id})
+        except Exception as e:
+            logging.warning(f"Update dedupe delete failed for {update_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "recent": len(self._recent),
+            "capacity": self._recent.maxlen,
+            "accepted": self.accepted,
+            "duplicates_dropped": self.dropped,
+        }
+
+    def _remember(self, update_id: int):
+        if len(self._recent) == self._recent.maxlen:
+            self._seen.discard(self._recent[0])  # about to fall off the ring
+        self._recent.append(update_id)
+        self._seen.add(update_id)
+
+    def _drop(self, source: str):
+        self.dropped += 1
+        UPDATES_DROPPED.inc(source)
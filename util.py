@@ -1,25 +1,23 @@
-import requests
 import time
 from dotenv import load_dotenv
 import os
-import pymongo
 from datetime import datetime
 import logging
 from telethon.errors import PhoneNumberInvalidError, FloodWaitError
 from telethon.tl.functions.contacts import ImportContactsRequest, DeleteContactsRequest
 from telethon.tl.types import InputPhoneContact
-import pandas as pd
+import math
 import re
 from datetime import datetime
 import asyncio
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
+from bot_api import BotAPI, TELEGRAM_API_URL
+from dispatcher import OutboundDispatcher
+from database import mongo
+from audit_log import AuditLogBuffer
 
-
-logging.basicConfig(
-    filename='app.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+if TYPE_CHECKING:
+    import pandas as pd  # loaded on first import request, not at startup
 
 # load environment variables
 load_dotenv()
@@ -40,40 +38,62 @@ else:
     USER_COLLECTION = os.getenv("USER_COLLECTION")
     LOG_COLLECTION = os.getenv("LOG_COLLECTION")  # New: telegram_log
 
-# MongoDB Setup
-client = pymongo.MongoClient(MONGO_URI)
-db = client[DB]
-users_collection = db[USER_COLLECTION]
-log_collection = db[LOG_COLLECTION]  # New log collection
+# Lifetime of a one-time join-request link
+INVITE_LINK_TTL = 86400
+
+# Shared Bot API client (started/closed in main.lifespan)
+bot_api = BotAPI(
+    BOT_TOKEN,
+    base_url=os.getenv("TELEGRAM_API_URL", TELEGRAM_API_URL),
+    timeout=float(os.getenv("BOT_API_TIMEOUT", "10")),
+)
+
+# Paced outbound queue in front of bot_api (Telegram 429 limits)
+dispatcher = OutboundDispatcher(
+    bot_api,
+    global_rate=float(os.getenv("BOT_GLOBAL_RATE", "30")),
+    per_chat_rate=float(os.getenv("BOT_PER_CHAT_RATE", "1")),
+)
+
+# MongoDB Setup (shared pool from database.py, connected in main.lifespan)
+users_collection = mongo.collection(USER_COLLECTION)
+log_collection = mongo.collection(LOG_COLLECTION)  # New log collection
+
+# log_collection mirror writes are buffered and bulk-flushed (started/flushed in main.lifespan)
+audit_log = AuditLogBuffer(
+    log_collection,
+    max_batch=int(os.getenv("AUDIT_FLUSH_BATCH", "500")),
+    flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("AUDIT_MAX_PENDING", "50000")),
+)
 
 # -------------------- Utility Functions --------------------
 
-def telegram_bot_sendtext(bot_message, telegram_id):
+async def telegram_bot_sendtext(bot_message, telegram_id):
     """Send message to a specific Telegram user."""
-    send_text = f'https://api.telegram.org/bot{BOT_TOKEN}/sendMessage?chat_id={telegram_id}&parse_mode=HTML&text={bot_message}'
     try:
-        response = requests.get(send_text)
-        logging.info(f"Sent message to {telegram_id}: {response.json()}")
-        return response.json()
+        result = await dispatcher.submit("sendMessage", {
+            "chat_id": telegram_id,
+            "parse_mode": "HTML",
+            "text": bot_message,
+        }, chat_key=telegram_id)
+        logging.info(f"Sent message to {telegram_id}: {result}")
+        return result
     except Exception as e:
         logging.error(f"Error sending Telegram message to {telegram_id}: {e}")
         return None
 
 
-def create_temp_invite_link():
+async def create_temp_invite_link():
     """Create a one-time, expiring Telegram group invite link."""
-    print("BOT_TOKEN in create_temp_invite_link", BOT_TOKEN)
-    print("GROUP_CHAT_ID in create_temp_invite_link", GROUP_CHAT_ID)
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/createChatInviteLink"
     data = {
         "chat_id": GROUP_CHAT_ID,
-        "expire_date": int(time.time()) + 86400,  
+        "expire_date": int(time.time()) + INVITE_LINK_TTL,
         "creates_join_request": True
     }
     try:
-        response = requests.post(url, json=data)
-        result = response.json()
-        print("result", result)
+        result = await dispatcher.submit("createChatInviteLink", data)
+        logging.debug("createChatInviteLink response", extra={"payload": result})
         raw_link = result.get("result", {}).get("invite_link", "")
         if raw_link:
             logging.info(f"Generated invite link: {raw_link}")
@@ -84,47 +104,47 @@ def create_temp_invite_link():
         logging.error(f"Error generating invite link: {e}")
         return None
 
-def add_user(telegram_id: int, expiry_date: datetime, invite_link: str):
+async def add_user(telegram_id: int, expiry_date: datetime, invite_link: str):
     """Add or update a user in MongoDB."""
-    users_collection.update_one(
+    await users_collection.update_one(
         {"telegram_id": telegram_id},
         {"$set": {"expiry_date": expiry_date, "invite_link": invite_link, "joined": False}},
         upsert=True
     )
     logging.info(f"[Added] User {telegram_id} added with expiry {expiry_date}.")
 
-def kick_user(telegram_id: int):
-    """Kick a user from the Telegram group."""
-    kick_url = f"https://api.telegram.org/bot{BOT_TOKEN}/banChatMember?chat_id={GROUP_CHAT_ID}&user_id={telegram_id}"
-    unban_url = f"https://api.telegram.org/bot{BOT_TOKEN}/unbanChatMember?chat_id={GROUP_CHAT_ID}&user_id={telegram_id}"
+async def kick_user(telegram_id: int) -> bool:
+    """Kick a user from the Telegram group; True if the ban went through."""
+    params = {"chat_id": GROUP_CHAT_ID, "user_id": telegram_id}
     try:
-        response = requests.get(kick_url)
-        logging.info(f"Kick response for {telegram_id}: {response.json()}")
-        response = requests.get(unban_url)
-        logging.info(f"Unban response for {telegram_id}: {response.json()}")
+        result = await dispatcher.submit("banChatMember", params)
+        logging.info(f"Kick response for {telegram_id}: {result}")
+        if not result.get("ok"):
+            logging.error(f"Error kicking user {telegram_id}: {result.get('description')}")
+            return False
+        result = await dispatcher.submit("unbanChatMember", params)
+        logging.info(f"Unban response for {telegram_id}: {result}")
         logging.info(f"[Auto Kick] User {telegram_id} kicked successfully.")
+        return True
     except Exception as e:
         logging.error(f"Error kicking user {telegram_id}: {e}")
+        return False
 
 
-def send_group_subscription_notification(telegram_id: int):
+async def send_group_subscription_notification(telegram_id: int):
     """Notify group about a new subscription."""
     message = f"🎉 A new user has subscribed and is eligible to join the group! User ID: {telegram_id}"
-    telegram_bot_sendtext(message, GROUP_CHAT_ID)
+    await telegram_bot_sendtext(message, GROUP_CHAT_ID)
 
 
-def extend_plan_in_db(telegram_id, new_expiry_date):
+async def extend_plan_in_db(telegram_id, new_expiry_date):
     """Extend plan in DB (unused, but if called, mirror to log)."""
-    users_collection.update_one(
-        {"telegram_id": telegram_id},
-        {"$set": {"expiry_date": new_expiry_date}},
-        upsert=True
-    )
-    log_collection.update_one(
+    await users_collection.update_one(
         {"telegram_id": telegram_id},
         {"$set": {"expiry_date": new_expiry_date}},
         upsert=True
     )
+    audit_log.update({"telegram_id": telegram_id}, {"expiry_date": new_expiry_date}, upsert=True)
     logging.info(f"Extended plan for user {telegram_id} in both collections")
 
 
@@ -133,7 +153,7 @@ def extend_plan_in_db(telegram_id, new_expiry_date):
 # -----------------------------
 def clean_phone_number(phone: Optional[str]) -> Optional[str]:
     """Normalize phone to format +91XXXXXXXXXX"""
-    if not phone or (isinstance(phone, float) and pd.isna(phone)):
+    if not phone or (isinstance(phone, float) and math.isnan(phone)):
         return None
 
     raw = str(phone).strip()
@@ -160,7 +180,7 @@ def parse_date(value: Optional[str]) -> Optional[datetime]:
     Convert '19 Dec, 2024' → datetime object in UTC format.
     Returns None if blank or invalid.
     """
-    if not value or (isinstance(value, float) and pd.isna(value)):
+    if not value or (isinstance(value, float) and math.isnan(value)):
         return None
 
     try:
@@ -176,6 +196,7 @@ def parse_date(value: Optional[str]) -> Optional[datetime]:
 # -----------------------------
 def transform_row_data(row) -> dict:
     """Map CSV columns → internal schema."""
+    import pandas as pd
 
     def clean_field(val):
         """Convert NaN, empty, or 'nan' values to None."""
@@ -212,6 +233,57 @@ def transform_row_data(row) -> dict:
     return mapped
 
 
+# -----------------------------
+# Vectorized variants (streaming import)
+# -----------------------------
+IMPORT_TEXT_FIELDS = [
+    "account_name", "full_name", "email", "pan_number", "start_date",
+    "expiry_date", "telegram_name", "status", "calling_status",
+]
+
+
+def clean_phone_series(col: "pd.Series") -> "pd.Series":
+    """clean_phone_number applied to a whole column at once."""
+    raw = col.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+    digits = raw.str.replace(r"\D", "", regex=True)
+    length = digits.str.len()
+
+    cleaned = ("+" + digits).where(~raw.str.startswith("+").fillna(False).astype(bool), raw)
+    cleaned = cleaned.mask((length.eq(12) & digits.str.startswith("91")).fillna(False).astype(bool), "+" + digits)
+    cleaned = cleaned.mask((length.eq(11) & digits.str.startswith("0")).fillna(False).astype(bool), "+91" + digits.str[1:])
+    cleaned = cleaned.mask(length.eq(10).fillna(False).astype(bool), "+91" + digits)
+
+    empty = col.isna() | col.astype("string").eq("").fillna(False).astype(bool)
+    return cleaned.astype(object).mask(empty, None)
+
+
+def clean_field_series(col: "pd.Series") -> "pd.Series":
+    """transform_row_data's clean_field applied to a whole column at once."""
+    stripped = col.astype("string").str.strip()
+    blank = col.isna() | stripped.str.lower().isin(["", "nan", "none", "null"]).fillna(False).astype(bool)
+    return stripped.astype(object).mask(blank, None)
+
+
+def transform_frame(df: "pd.DataFrame") -> list:
+    """Map a CSV chunk → list of internal-schema dicts (same output as transform_row_data)."""
+    import pandas as pd
+
+    missing = pd.Series(None, index=df.index, dtype=object)
+
+    def column(name):
+        return df[name] if name in df.columns else missing
 
+    out = pd.DataFrame(index=df.index)
+    out["phone"] = clean_phone_series(column("phone"))
+    out["mobile"] = clean_phone_series(column("mobile"))
+    for name in IMPORT_TEXT_FIELDS:
+        out[name] = clean_field_series(column(name))
+    out["telegram_id"] = None
+    out["telegram_username"] = None
+    out["joined"] = False
 
+    # zip over plain lists is several times faster than DataFrame.to_dict("records")
+    columns = list(out.columns)
+    values = [out[name].astype(object).where(out[name].notna(), None).tolist() for name in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
 
@@ -0,0 +1,80 @@
+# -------------------------------------------------------------
+# workers.py
+# Bounded async worker pool with per-key ordering.
+import asyncio
+import logging
+
+
+class KeyedWorkerPool:
+    """
+    Runs `handler(item)` on a fixed number of workers.
+    Items submitted with the same key always land on the same worker queue,
+    so they are processed one at a time and in arrival order.
+    """
+
+    def __init__(self, handler, workers: int = 8, maxsize: int = 10000, name: str = "worker"):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.name = name
+        self._queues = []
+        self._tasks = []
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        # Split the bound across queues so total backlog stays <= maxsize.
+        per_queue = max(1, self.maxsize // self.workers)
+        self._queues = [asyncio.Queue(per_queue) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._run(q)) for q in self._queues]
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Let queued items finish (up to drain_timeout), then cancel the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"{self.name} pool stopped with {self.depth} items pending")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key, item) -> bool:
+        """Queue an item without waiting; returns False when that worker's queue is full."""
+        self.start()
+        try:
+            self._queues[hash(key) % self.workers].put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    @property
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    async def _run(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logging.error(f"{self.name} error: {e}", exc_info=True)
+            finally:
+                queue.task_done()